@@ -1,14 +1,31 @@
+import time
+import html
+import uuid
+_import_start = time.perf_counter()
+
 import streamlit as st
 import base64
 import os
-from openai import OpenAI
-from nltk.tokenize import sent_tokenize
+import pandas as pd
 
-from modules.file_handler import extract_text_from_file
-from modules.summarizer import summarize_text
-from modules.qa_module import answer_question
+from modules import metrics, model_registry
+from modules.cache import LRUCache, content_hash
+from modules.file_handler import PAGE_BREAK, extract_pages_from_file, extract_text_from_file, read_file_bytes, read_question_list
+from modules.summarizer import cached_summary, summarize_text
+from modules.qa_module import answer_question, answer_question_long, answer_questions
+from modules.retriever import PassageIndexBuilder, get_passage_index
+from modules.sentence_index import get_sentence_index
+from modules.page_index import MAX_SEARCH_HITS, get_page_index
 from modules.question_gen import generate_questions
 from modules.evaluator import evaluate_answer
+from modules.openrouter_api import get_api_client
+from modules.corpus import answer_corpus_question, get_corpus
+from modules.jobs import get_job_manager
+
+model_registry.record_startup_time(time.perf_counter() - _import_start)
+
+# Challenge feedback kept per session, so unchanged answers aren't re-evaluated on reruns
+EVALUATION_CACHE_SIZE = 64
 
 st.set_page_config(
     page_title="DocSummarizer Pro",
@@ -429,8 +446,15 @@ def initialize_session_state():
         st.session_state.user_answers = []
     if "summary" not in st.session_state:
         st.session_state.summary = ""
-    if "summary_filename" not in st.session_state:
-        st.session_state.summary_filename = ""
+    if "summary_doc_hash" not in st.session_state:
+        st.session_state.summary_doc_hash = ""
+    if "evaluation_cache" not in st.session_state:
+        st.session_state.evaluation_cache = LRUCache(EVALUATION_CACHE_SIZE)
+    if "session_id" not in st.session_state:
+        # Identifies this session as an owner of background jobs
+        st.session_state.session_id = uuid.uuid4().hex
+    if "question_job" not in st.session_state:
+        st.session_state.question_job = None
 
 # ============================================================================
 # UTILITY FUNCTIONS
@@ -442,93 +466,31 @@ def create_download_link(text, filename, link_text="📥 Download"):
     href = f'<a href="data:text/plain;base64,{b64}" download="{filename}" style="text-decoration: none; color: #667eea; font-weight: 600;">{link_text}</a>'
     return href
 
+def render_job_progress(job, label):
+    """Show a background job's progress and rerun the app once it finishes"""
+    if hasattr(st, "fragment"):
+        @st.fragment(run_every=1.0)
+        def poll():
+            if job.finished():
+                st.rerun()
+            st.progress(job.progress, text=f"{label} ({job.done}/{job.total})" if job.total else label)
+        poll()
+    else:
+        # Older Streamlit: main() sleeps and reruns at the end of the script
+        st.progress(job.progress, text=label)
+        st.session_state.jobs_pending = True
+
+def poll_pending_jobs():
+    """Rerun periodically while jobs are running, when fragments are unavailable"""
+    if st.session_state.pop("jobs_pending", False):
+        time.sleep(1.0)
+        (st.rerun if hasattr(st, "rerun") else st.experimental_rerun)()
+
 def display_status(message, status_type="info"):
     """Display status message with appropriate styling"""
     status_class = f"status-{status_type}"
     st.markdown(f'<div class="{status_class}">{message}</div>', unsafe_allow_html=True)
 
-# ============================================================================
-# API FUNCTIONS
-# ============================================================================
-
-class OpenRouterAPI:
-    """Handle OpenRouter API interactions"""
-    
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v2",
-            api_key="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",
-        )
-        self.headers = {
-            "HTTP-Referer": "https://genai-assistant.streamlit.app/",
-            "X-Title": "SmartResearchAssistant"
-        }
-    
-    def answer_question(self, question, context):
-        """Get answer from OpenRouter API"""
-        prompt = f"""You are a research assistant. Answer based only on the document below:
-
-DOCUMENT:
-\"\"\"
-{context[:3000]}
-\"\"\"
-
-Q: {question}
-A:"""
-
-        completion = self.client.chat.completions.create(
-            model="deepseek/deepseek-r1-0528:free",
-            messages=[{"role": "user", "content": prompt}],
-            extra_headers=self.headers
-        )
-
-        return {
-            "answer": completion.choices[0].message.content,
-            "score": 1.0
-        }
-    
-    def generate_questions(self, context):
-        """Generate questions from document"""
-        prompt = f"""Generate 3 logic-based or comprehension questions from this document:
-
-\"\"\"
-{context[:3000]}
-\"\"\"
-
-Return the questions numbered as 1., 2., 3."""
-
-        completion = self.client.chat.completions.create(
-            model="deepseek/deepseek-r1-0528:free",
-            messages=[{"role": "user", "content": prompt}],
-            extra_headers=self.headers
-        )
-
-        raw = completion.choices[0].message.content.strip()
-        questions = [line.split('.', 1)[1].strip() for line in raw.splitlines() if '.' in line]
-        return questions
-    
-    def evaluate_answer(self, user_answer, context, question):
-        """Evaluate user's answer"""
-        prompt = f"""Evaluate the user's answer based only on this document:
-
-\"\"\"
-{context[:3000]}
-\"\"\"
-
-Question: {question}
-Answer: {user_answer}
-
-Give a short evaluation like 'Correct', 'Partially correct', or 'Incorrect' with a one-line justification."""
-
-        completion = self.client.chat.completions.create(
-            model="deepseek/deepseek-r1-0528:free",
-            messages=[{"role": "user", "content": prompt}],
-            extra_headers=self.headers
-        )
-
-        return completion.choices[0].message.content.strip()
-
 # ============================================================================
 # UI COMPONENTS
 # ============================================================================
@@ -556,6 +518,12 @@ def render_sidebar():
             help="Select your preferred AI model"
         )
         
+        st.checkbox(
+            "📚 Corpus mode",
+            key="corpus_mode",
+            help="Upload several documents and ask questions across all of them"
+        )
+        
         st.markdown("---")
         st.markdown("### 📊 Statistics")
         
@@ -566,8 +534,50 @@ def render_sidebar():
             word_count = len(st.session_state.doc_text.split())
             st.metric("Document Words", f"{word_count:,}")
         
+        with st.expander("⏱️ Performance", expanded=False):
+            if model_registry.startup_time is not None:
+                st.metric("Startup Import Time", f"{model_registry.startup_time:.2f} s")
+            if model_registry.load_times:
+                for name, seconds in model_registry.load_times.items():
+                    st.metric(f"Model Load: {name}", f"{seconds:.1f} s")
+            else:
+                st.caption("No models loaded yet")
+        
+        render_stage_metrics()
+        
         return mode_choice
 
+def render_stage_metrics():
+    """Render per-stage latency and memory in a collapsible sidebar panel"""
+    stages = metrics.snapshot()
+    with st.expander("📈 Stage Metrics", expanded=False):
+        if not stages:
+            st.caption("No stages have run yet")
+            return
+        for stage, stats in sorted(stages.items()):
+            avg = stats["seconds_total"] / stats["count"]
+            st.metric(
+                stage,
+                f"{stats['last_seconds']:.2f} s",
+                help=f"{stats['count']} calls · avg {avg:.2f} s · max {stats['seconds_max']:.2f} s · "
+                     f"last input {stats['last_input_bytes']:,} chars · "
+                     f"RSS {stats['last_rss_growth_bytes'] / 2**20:+.0f} MB (max +{stats['rss_growth_max_bytes'] / 2**20:.0f} MB)"
+            )
+
+def render_cloud_cache_stats(api_client):
+    """Render OpenRouter response cache counters in the sidebar"""
+    stats = api_client.cache_stats()
+    with st.sidebar:
+        with st.expander("🗄️ Cloud Response Cache", expanded=False):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Cache Hits", stats["memory_hits"] + stats["disk_hits"])
+            with col2:
+                st.metric("API Calls", stats["misses"])
+            st.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+            st.metric("Time Saved", f"{stats['seconds_saved']:.1f} s")
+            st.metric("Prompt Tokens Sent", f"{stats['prompt_tokens']:,}")
+
 def render_file_upload():
     """Render file upload section"""
     st.markdown('<h3 class="section-header">📤 Document Upload</h3>', unsafe_allow_html=True)
@@ -589,20 +599,65 @@ def render_file_upload():
                 file_type = "📋 TXT" if uploaded_file.type == "text/plain" else "📑 PDF"
                 st.metric("📁 Type", file_type)
         
-        # Process file with enhanced feedback
+        # Process file with enhanced feedback; files are identified by content, not name
+        file_hash = content_hash(read_file_bytes(uploaded_file))
         if ("doc_text" not in st.session_state or 
-            st.session_state.get("uploaded_filename") != uploaded_file.name):
+            st.session_state.get("uploaded_hash") != file_hash):
             
             with st.spinner("🔄 Processing document... This may take a moment"):
-                text = extract_text_from_file(uploaded_file)
+                # Pages stream in order so the first ones can be shown while the rest extract
+                progress_bar = st.progress(0.0)
+                preview = st.empty()
+                pages = []
+                status = {}
+                is_pdf = uploaded_file.type == "application/pdf"
+                # Passages are indexed as pages arrive instead of after the last one
+                passages = PassageIndexBuilder()
+                with metrics.trace_stage("extract_text_from_file", uploaded_file.size):
+                    for page_number, total_pages, page in extract_pages_from_file(uploaded_file, status=status):
+                        page = page or ""
+                        pages.append(page)
+                        passages.add(page + PAGE_BREAK if is_pdf else page)
+                        progress_bar.progress((page_number + 1) / total_pages, text=f"Extracted page {page_number + 1} of {total_pages}")
+                        if page_number < 2 and total_pages > 1:
+                            preview.caption(f"📄 Page {page_number + 1} preview: {page[:300]}…")
+                progress_bar.empty()
+                preview.empty()
+                if is_pdf:
+                    text = "".join(page + PAGE_BREAK for page in pages)
+                else:
+                    text = pages[0]
                 st.session_state.doc_text = text
                 st.session_state.uploaded_filename = uploaded_file.name
+                st.session_state.uploaded_hash = file_hash
+                # Build the retrieval and sentence indexes once at ingest
+                get_passage_index(text, built=passages.finish())
+                get_sentence_index(text)
+                get_page_index(text)
                 # Clear old summary when new file is uploaded
                 st.session_state.summary = ""
                 st.session_state.challenge_questions = []
+                st.session_state.batch_results = None
+                st.session_state.evaluation_cache.clear()
+                st.session_state.question_job = None
+                # Stop work on the previous document nobody else is waiting for
+                get_job_manager().release(st.session_state.session_id, keep_doc_hash=file_hash)
+                st.session_state.viewer_page = 0
+                st.session_state.viewer_highlight = None
+                st.session_state.answer_span = None
+                # Partial extractions are flagged for as long as this document is loaded
+                warnings = []
+                if status["page_count"] > len(pages):
+                    warnings.append(f"only the first {len(pages)} of {status['page_count']} pages were extracted")
+                if status["timed_out"]:
+                    warnings.append(f"{len(status['timed_out'])} page(s) timed out and are empty "
+                                    f"(first: page {status['timed_out'][0] + 1})")
+                st.session_state.extraction_warning = "; ".join(warnings)
                 display_status("✅ Document processed and ready for analysis", "success")
         else:
             display_status("⚡ Using cached document from memory", "info")
+        if st.session_state.get("extraction_warning"):
+            display_status(f"⚠️ Partial extraction: {st.session_state.extraction_warning}", "warning")
     
     return uploaded_file
 
@@ -614,14 +669,48 @@ def render_document_summary():
     st.markdown('<h3 class="section-header">📝 Document Summary</h3>', unsafe_allow_html=True)
     
     # Check if summary needs to be regenerated for new document
-    current_filename = st.session_state.get("uploaded_filename", "")
+    current_hash = st.session_state.get("uploaded_hash", "")
     if (not st.session_state.summary or 
-        st.session_state.get("summary_filename") != current_filename):
+        st.session_state.get("summary_doc_hash") != current_hash):
         
-        with st.spinner("🧠 Generating intelligent summary..."):
-            summary = summarize_text(st.session_state.doc_text)
-            st.session_state.summary = summary
-            st.session_state.summary_filename = current_filename
+        jobs = get_job_manager()
+        session_id = st.session_state.session_id
+        # A failed summary stays failed until the user retries it
+        retry = False
+        error = st.session_state.get("summary_error")
+        if error and error[0] == current_hash:
+            st.error(f"❌ Failed to summarize document: {error[1]}")
+            if not st.button("🔄 Retry summary"):
+                return
+            st.session_state.summary_error = None
+            retry = True
+        
+        # This session's own job is collected first: its result is also in the
+        # summary cache by now, but it wasn't a cache hit
+        summary = None
+        job = jobs.get("summary", current_hash)
+        if retry or job is None or session_id not in job.owners:
+            # Summaries are shared across sessions by document content and settings
+            summary = None if retry else cached_summary(st.session_state.doc_text)
+            if summary is None:
+                # Summarize off the script thread so the rest of the page stays usable
+                job = jobs.submit(
+                    "summary", current_hash, session_id,
+                    summarize_text, st.session_state.doc_text, retry=retry
+                )
+        st.session_state.summary_from_cache = summary is not None
+        if summary is None:
+            if not job.finished():
+                render_job_progress(job, "🧠 Generating intelligent summary...")
+                return
+            try:
+                summary = jobs.collect(job, session_id)
+            except Exception as e:
+                st.session_state.summary_error = (current_hash, str(e))
+                st.error(f"❌ Failed to summarize document: {e}")
+                return
+        st.session_state.summary = summary
+        st.session_state.summary_doc_hash = current_hash
     
     # Display summary in a beautiful card
     st.markdown(f"""
@@ -642,6 +731,10 @@ def render_document_summary():
         else:
             display_status(f"⚠️ Summary is lengthy ({word_count} words)", "warning")
     
+    with col2:
+        if st.session_state.get("summary_from_cache"):
+            display_status("⚡ From cache", "info")
+    
     with col3:
         st.markdown(
             create_download_link(st.session_state.summary, "summary.txt", "📥 Download Summary"),
@@ -671,10 +764,23 @@ def render_ask_anything_mode(api_client, mode_choice):
             help="Type your question here"
         )
         
+        long_context = False
+        if mode_choice == "💻 Local (Free)":
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                long_context = st.checkbox(
+                    "🔭 Long-context search",
+                    help="Scan the whole document, most relevant windows first, until an answer is confident enough"
+                )
+            with col2:
+                confidence = st.slider("Confidence threshold", 0.1, 0.95, 0.5, 0.05, disabled=not long_context)
+        
         if question.strip() and st.session_state.doc_text.strip():
             with st.spinner("🤔 Thinking..."):
                 try:
-                    if mode_choice == "💻 Local (Free)":
+                    if mode_choice == "💻 Local (Free)" and long_context:
+                        result = answer_question_long(question, st.session_state.doc_text, confidence=confidence, top_k=3)
+                    elif mode_choice == "💻 Local (Free)":
                         result = answer_question(question, st.session_state.doc_text)
                     else:
                         result = api_client.answer_question(question, st.session_state.doc_text)
@@ -689,17 +795,32 @@ def render_ask_anything_mode(api_client, mode_choice):
                     </div>
                     """, unsafe_allow_html=True)
                     
+                    if "cached_similarity" in result:
+                        st.caption(f"⚡ Reused the answer to a similar earlier question (similarity {result['cached_similarity']:.2f})")
+                    
+                    # Remember where the answer is so the raw-text viewer can jump to it
+                    if "start" in result:
+                        st.session_state.answer_span = (result["start"], result["end"])
+                    
                     # Add justification for local mode
                     if mode_choice == "💻 Local (Free)":
-                        sentences = sent_tokenize(st.session_state.doc_text)
-                        relevant = [s for s in sentences if result["answer"] in s]
-                        if relevant:
+                        sentence_index = get_sentence_index(st.session_state.doc_text)
+                        justification = sentence_index.span_text(result["start"], result["end"])
+                        if justification:
                             st.markdown(f"""
                             <div style="background: rgba(34, 197, 94, 0.1); padding: 1rem; border-radius: 8px; margin-top: 1rem; border-left: 4px solid #22c55e;">
-                                <strong>🧠 Justification:</strong> {relevant[0]}
+                                <strong>🧠 Justification:</strong> {justification}
                             </div>
                             """, unsafe_allow_html=True)
                     
+                    if long_context:
+                        st.caption(
+                            f"🔭 Read {result['windows_evaluated']} of {result['windows_total']} windows · "
+                            f"confidence {result['score']:.2f}"
+                        )
+                        for candidate in result["candidates"][1:]:
+                            st.caption(f"Also possible: “{candidate['answer']}” ({candidate['score']:.2f}, chars {candidate['start']}–{candidate['end']})")
+                    
                     # Log the QnA
                     st.session_state.qna_log.append(f"Q: {question}\nA: {result['answer']}\n\n")
                     
@@ -709,6 +830,8 @@ def render_ask_anything_mode(api_client, mode_choice):
         elif question.strip():
             display_status("ℹ️ Please upload a document first", "info")
     
+    render_batch_questions(api_client, mode_choice)
+    
     # Show QnA history download option
     if st.session_state.qna_log:
         st.markdown("---")
@@ -718,28 +841,154 @@ def render_ask_anything_mode(api_client, mode_choice):
             unsafe_allow_html=True
         )
 
+def render_corpus_mode(api_client, mode_choice):
+    """Render multi-document upload and cross-document Ask Anything"""
+    st.markdown('<h3 class="section-header">📚 Document Corpus</h3>', unsafe_allow_html=True)
+    corpus = get_corpus()
+    
+    uploaded_files = st.file_uploader(
+        "Add PDF or TXT files to the corpus",
+        type=["pdf", "txt"],
+        accept_multiple_files=True,
+        key="corpus_files",
+        help="Each new document is indexed once; documents already in the corpus are skipped"
+    )
+    # Uploads stay in the widget across reruns, so only index each one once per session
+    ingested = st.session_state.setdefault("corpus_ingested", set())
+    for uploaded_file in uploaded_files or []:
+        file_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+        if file_id in ingested:
+            continue
+        with st.spinner(f"🔄 Indexing {uploaded_file.name}..."):
+            corpus.add_document(uploaded_file.name, extract_text_from_file(uploaded_file))
+        ingested.add(file_id)
+    
+    documents = corpus.manifest()
+    if not documents:
+        display_status("ℹ️ Add documents to start building the corpus", "info")
+        return
+    st.metric("Documents in Corpus", len(documents))
+    with st.expander("🗂️ Indexed Documents", expanded=False):
+        st.dataframe(pd.DataFrame(documents)[["name", "chars", "passages"]], use_container_width=True)
+    
+    question = st.text_input(
+        "🗨️ Ask across all documents",
+        placeholder="Ask any question about your corpus...",
+        key="corpus_question"
+    )
+    if not question.strip():
+        return
+    
+    with st.spinner("🤔 Searching the corpus..."):
+        try:
+            if mode_choice == "💻 Local (Free)":
+                result = answer_corpus_question(question, corpus)
+            else:
+                hits = corpus.search(question)
+                context = "\n\n".join(f"[{hit['name']}] {hit['text']}" for hit in hits)
+                result = api_client.answer_question(question, context)
+                result["sources"] = hits
+                if hits:
+                    result.update(name=hits[0]["name"], start=hits[0]["start"], end=hits[0]["end"])
+        except Exception as e:
+            st.error(f"❌ Failed to get answer: {e}")
+            return
+    
+    st.markdown(f"""
+    <div class="answer-card fade-in">
+        <h4 style="color: #3b82f6; margin-bottom: 1rem;">✅ Answer</h4>
+        <p style="color: #e2e8f0; font-size: 1.1rem; line-height: 1.6; margin: 0;">
+            {result["answer"]}
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    if "name" in result:
+        st.caption(f"📄 Source: {result['name']} · chars {result['start']}–{result['end']}")
+    with st.expander("🔎 Retrieved Passages", expanded=False):
+        for hit in result["sources"]:
+            st.markdown(f"**{hit['name']}** · chars {hit['start']}–{hit['end']}")
+            st.caption(hit["text"][:400] + ("…" if len(hit["text"]) > 400 else ""))
+    st.session_state.qna_log.append(f"Q: {question}\nA: {result['answer']}\n\n")
+
+def render_batch_questions(api_client, mode_choice):
+    """Render bulk question upload and CSV export"""
+    with st.expander("📋 Batch Questions", expanded=False):
+        question_file = st.file_uploader(
+            "Upload a question list (TXT: one per line, CSV: 'question' column)",
+            type=["txt", "csv"],
+            key="batch_questions_file"
+        )
+        if not question_file:
+            return
+        
+        questions = read_question_list(question_file)
+        st.caption(f"{len(questions)} questions loaded")
+        if questions and st.button("▶️ Answer All Questions", use_container_width=True):
+            with st.spinner(f"🤔 Answering {len(questions)} questions..."):
+                if mode_choice == "💻 Local (Free)":
+                    results = answer_questions(questions, st.session_state.doc_text)
+                else:
+                    responses = api_client.run_concurrently(
+                        [(api_client.answer_question, (q, st.session_state.doc_text)) for q in questions]
+                    )
+                    results = [
+                        {"question": q, "answer": f"❌ {r}" if isinstance(r, Exception) else r["answer"],
+                         "score": 0 if isinstance(r, Exception) else r["score"]}
+                        for q, r in zip(questions, responses)
+                    ]
+            st.session_state.batch_results = pd.DataFrame(results)
+        
+        if st.session_state.get("batch_results") is not None:
+            st.dataframe(st.session_state.batch_results, use_container_width=True)
+            st.download_button(
+                "📥 Download Answers (CSV)",
+                st.session_state.batch_results.to_csv(index=False),
+                file_name="answers.csv",
+                mime="text/csv"
+            )
+
+def run_cloud_question_job(api_client, text, progress_callback=None):
+    """Background job wrapper for cloud question generation"""
+    progress_callback(0, 1)
+    questions = api_client.generate_questions(text)
+    progress_callback(1, 1)
+    return questions
+
 def render_challenge_mode(api_client, mode_choice):
     """Render Challenge Mode interface"""
     st.markdown("### 🧠 Challenge Mode")
     
+    doc_hash = st.session_state.get("uploaded_hash", "")
+    jobs = get_job_manager()
     if st.button("⚡ Generate 3 Questions", use_container_width=True):
-        with st.spinner("🎯 Generating challenging questions..."):
-            try:
-                if mode_choice == "☁️ Cloud (OpenRouter)":
-                    questions = api_client.generate_questions(st.session_state.doc_text)
-                else:
-                    questions = generate_questions(st.session_state.doc_text)
-                
-                st.session_state.challenge_questions = questions
-                st.session_state.user_answers = [""] * len(questions)
-                display_status("✅ Questions generated successfully!", "success")
-                
-            except Exception as e:
-                st.error(f"❌ Failed to generate questions: {e}")
+        # Generation runs in the background; cloud and local results are separate jobs.
+        # The button is an explicit request, so a failed earlier attempt is retried
+        kind = "questions:cloud" if mode_choice == "☁️ Cloud (OpenRouter)" else "questions:local"
+        if kind == "questions:cloud":
+            jobs.submit(kind, doc_hash, st.session_state.session_id, run_cloud_question_job,
+                        api_client, st.session_state.doc_text, retry=True)
+        else:
+            jobs.submit(kind, doc_hash, st.session_state.session_id, generate_questions,
+                        st.session_state.doc_text, retry=True)
+        st.session_state.question_job = kind
+    
+    job = jobs.get(st.session_state.question_job, doc_hash) if st.session_state.question_job else None
+    if job is not None and not job.finished():
+        render_job_progress(job, "🎯 Generating challenging questions...")
+    elif job is not None:
+        st.session_state.question_job = None
+        try:
+            questions = jobs.collect(job, st.session_state.session_id)
+            st.session_state.challenge_questions = questions
+            st.session_state.user_answers = [""] * len(questions)
+            display_status("✅ Questions generated successfully!", "success")
+        except Exception as e:
+            st.error(f"❌ Failed to generate questions: {e}")
     
     # Display questions and answers
     if st.session_state.challenge_questions:
         st.markdown("---")
+        answers = []
         for i, question in enumerate(st.session_state.challenge_questions):
             with st.container():
                 st.markdown(f"""
@@ -758,25 +1007,101 @@ def render_challenge_mode(api_client, mode_choice):
                     placeholder="Type your answer here..."
                 )
                 
-                if user_input.strip():
-                    try:
-                        if mode_choice == "☁️ Cloud (OpenRouter)":
-                            feedback = api_client.evaluate_answer(user_input, st.session_state.doc_text, question)
-                        else:
-                            feedback = evaluate_answer(user_input, st.session_state.doc_text)
-                        
-                        # Color code feedback
-                        feedback_color = "#22c55e" if "correct" in feedback.lower() else "#f59e0b"
-                        st.markdown(f"""
-                        <div style="background: rgba(59, 130, 246, 0.1); padding: 1rem; border-radius: 8px; margin: 1rem 0; border-left: 4px solid {feedback_color};">
-                            <strong>🧾 Feedback:</strong> {feedback}
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                    except Exception as e:
-                        st.error(f"❌ Failed to evaluate answer: {e}")
-                
+                # Feedback is filled in below once all answers are evaluated
+                answers.append((question, user_input, st.empty()))
                 st.markdown("---")
+        
+        # Only answers that changed since their last evaluation are sent to a model
+        cache = st.session_state.evaluation_cache
+        doc_hash = st.session_state.get("uploaded_hash", "")
+        answered = []
+        for question, user_input, slot in answers:
+            if user_input.strip():
+                key = (doc_hash, question, " ".join(user_input.split()), mode_choice)
+                answered.append((question, user_input, slot, key))
+        pending = [item for item in answered if item[3] not in cache]
+        
+        if mode_choice == "☁️ Cloud (OpenRouter)":
+            # Independent evaluations are sent to OpenRouter in parallel
+            feedbacks = api_client.evaluate_answers(
+                [(user_input, st.session_state.doc_text, question) for question, user_input, _, _ in pending]
+            )
+        else:
+            feedbacks = []
+            for question, user_input, _, _ in pending:
+                try:
+                    feedbacks.append(evaluate_answer(user_input, st.session_state.doc_text))
+                except Exception as e:
+                    feedbacks.append(e)
+        
+        new_feedback = {}
+        for (_, _, _, key), feedback in zip(pending, feedbacks):
+            new_feedback[key] = feedback
+            if not isinstance(feedback, Exception):
+                cache.set(key, feedback)
+        
+        for question, user_input, slot, key in answered:
+            feedback = new_feedback[key] if key in new_feedback else cache.get(key)
+            if isinstance(feedback, Exception):
+                slot.error(f"❌ Failed to evaluate answer: {feedback}")
+                continue
+            
+            # Color code feedback
+            feedback_color = "#22c55e" if "correct" in feedback.lower() else "#f59e0b"
+            slot.markdown(f"""
+            <div style="background: rgba(59, 130, 246, 0.1); padding: 1rem; border-radius: 8px; margin: 1rem 0; border-left: 4px solid {feedback_color};">
+                <strong>🧾 Feedback:</strong> {feedback}
+            </div>
+            """, unsafe_allow_html=True)
+
+def render_text_viewer():
+    """Render one page of the raw text at a time, with search and jump-to-answer"""
+    page_index = get_page_index(st.session_state.doc_text)
+    total_pages = len(page_index)
+    
+    def show(page, highlight=None):
+        st.session_state.viewer_page = page
+        st.session_state.viewer_highlight = highlight
+    
+    with st.expander("📄 View Raw Text", expanded=False):
+        query = st.text_input("🔍 Search document", key="viewer_query")
+        if query.strip():
+            hits = page_index.search(query)
+            st.caption(f"{len(hits)}{'+' if len(hits) == MAX_SEARCH_HITS else ''} matches")
+            for i, (page, start, end) in enumerate(hits[:10]):
+                snippet = page_index.text[max(start - 40, 0):end + 40].replace("\n", " ")
+                st.button(f"p.{page + 1}: …{snippet}…", key=f"viewer_hit_{i}",
+                          on_click=show, args=(page, (start, end)), use_container_width=True)
+        
+        answer_span = st.session_state.get("answer_span")
+        if answer_span:
+            st.button("🎯 Jump to last answer", on_click=show,
+                      args=(page_index.page_at(answer_span[0]), answer_span), use_container_width=True)
+        
+        page = min(st.session_state.get("viewer_page", 0), total_pages - 1)
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("◀", key="viewer_prev", on_click=show, args=(max(page - 1, 0),), disabled=page == 0)
+        with col2:
+            st.caption(f"Page {page + 1} of {total_pages}")
+        with col3:
+            st.button("▶", key="viewer_next", on_click=show, args=(min(page + 1, total_pages - 1),),
+                      disabled=page == total_pages - 1)
+        
+        # Only the visible page is sent to the browser, with the selected span marked
+        page_start, page_end = page_index.bounds(page)
+        text = page_index.page(page)
+        content = html.escape(text)
+        highlight = st.session_state.get("viewer_highlight")
+        if highlight and page_start <= highlight[0] < page_end:
+            start, end = highlight[0] - page_start, min(highlight[1], page_end) - page_start
+            content = (html.escape(text[:start]) + "<mark>" + html.escape(text[start:end]) + "</mark>"
+                       + html.escape(text[end:]))
+        st.markdown(
+            f'<div style="height: 300px; overflow-y: auto; white-space: pre-wrap; font-family: monospace; '
+            f'font-size: 0.85rem; color: #e2e8f0;">{content}</div>',
+            unsafe_allow_html=True
+        )
 
 def render_footer():
     """Render the footer"""
@@ -793,6 +1118,11 @@ def render_footer():
 
 def main():
     """Main application function"""
+    # Optionally start loading models in the background
+    model_registry.configure_threads()
+    model_registry.warm_up()
+    metrics.start_metrics_server()
+    
     # Load custom CSS
     load_custom_css()
     
@@ -807,14 +1137,26 @@ def main():
     
     # Initialize API client
     api_key = os.getenv("API_KEY")
-    api_client = OpenRouterAPI(api_key) if mode_choice == "☁️ Cloud (OpenRouter)" else None
+    api_client = None
+    if mode_choice == "☁️ Cloud (OpenRouter)":
+        if api_key:
+            api_client = get_api_client(api_key)
+            render_cloud_cache_stats(api_client)
+        else:
+            st.sidebar.error("☁️ Cloud mode needs an OpenRouter key in the API_KEY environment variable. Using local models.")
+            mode_choice = "💻 Local (Free)"
     
     # Main content area
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        # File upload section
-        uploaded_file = render_file_upload()
+        if st.session_state.get("corpus_mode"):
+            # Questions across every document in the persistent corpus
+            render_corpus_mode(api_client, mode_choice)
+            uploaded_file = None
+        else:
+            # File upload section
+            uploaded_file = render_file_upload()
         
         if uploaded_file and st.session_state.doc_text:
             # Document summary
@@ -836,17 +1178,16 @@ def main():
     
     with col2:
         # Raw text viewer (collapsible)
-        if st.session_state.doc_text:
-            with st.expander("📄 View Raw Text", expanded=False):
-                st.text_area(
-                    "Document Content",
-                    st.session_state.doc_text,
-                    height=300,
-                    disabled=True
-                )
+        if st.session_state.doc_text and not st.session_state.get("corpus_mode"):
+            render_text_viewer()
     
     # Render footer
     render_footer()
+    
+    # Write per-stage metrics for Prometheus, if configured
+    metrics.export_prometheus()
+    
+    poll_pending_jobs()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
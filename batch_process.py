@@ -0,0 +1,148 @@
+"""Headless batch processing for a directory of documents.
+
+    python batch_process.py reports/ --output results.jsonl
+    python batch_process.py reports/ --output results.jsonl --workers 4 --questions 5
+
+Every PDF/TXT file is extracted, summarized and turned into challenge
+questions with the same modules the Streamlit app uses, and one JSON line
+is appended per file. Files whose content hash already has a successful
+record in the output are skipped, so an interrupted run can be resumed.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from modules.cache import content_hash
+from modules.model_registry import available_cpus
+
+FILE_TYPES = {".pdf": "application/pdf", ".txt": "text/plain"}
+
+
+class LocalFile:
+    """Minimal stand-in for a Streamlit UploadedFile backed by a path"""
+
+    def __init__(self, path: str, data: bytes):
+        self.name = os.path.basename(path)
+        self.type = FILE_TYPES[os.path.splitext(path)[1].lower()]
+        self.size = len(data)
+        self._data = data
+
+    def getvalue(self) -> bytes:
+        return self._data
+
+
+def _init_worker(threads, summarize, questions):
+    # Load each model once per worker process, before any file is handled
+    from modules.model_registry import configure_threads, get_model
+
+    if summarize or questions:
+        # Split the CPUs between workers instead of each one using all of them
+        configure_threads(threads)
+    if summarize:
+        get_model("summarizer")
+    if questions:
+        get_model("generator")
+
+
+def process_file(path, summarize=True, question_count=3):
+    from modules.file_handler import extract_text_from_file
+    from modules.question_gen import generate_questions
+    from modules.summarizer import summarize_text
+
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        data = f.read()
+    record = {"file": path, "sha256": content_hash(data)}
+    try:
+        text = extract_text_from_file(LocalFile(path, data))
+        record["chars"] = len(text)
+        if summarize:
+            record["summary"] = summarize_text(text)
+        if question_count:
+            record["questions"] = generate_questions(text, count=question_count)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def find_documents(input_dir, recursive=False):
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        paths.extend(os.path.join(root, name) for name in files if os.path.splitext(name)[1].lower() in FILE_TYPES)
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def completed_hashes(output_path):
+    """Content hashes that already have a successful record in the output"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from an interrupted run
+            if "error" not in record:
+                done.add(record.get("sha256"))
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="directory containing PDF/TXT files")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--questions", type=int, default=3, help="questions per document, 0 to skip")
+    parser.add_argument("--no-summary", action="store_true", help="skip summarization")
+    parser.add_argument("--recursive", action="store_true", help="include subdirectories")
+    args = parser.parse_args(argv)
+
+    paths = find_documents(args.input_dir, args.recursive)
+    done = completed_hashes(args.output)
+    todo = []
+    for path in paths:
+        with open(path, "rb") as f:
+            if content_hash(f.read()) not in done:
+                todo.append(path)
+    print(f"{len(paths)} documents found, {len(paths) - len(todo)} already processed, {len(todo)} to do")
+    if not todo:
+        return 0
+
+    cpus = available_cpus()
+    workers = max(1, min(args.workers or cpus, len(todo)))
+    summarize = not args.no_summary
+    # spawn keeps torch state out of the workers' address space until they load models themselves
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(max(1, cpus // workers), summarize, args.questions),
+    )
+    failures = 0
+    with pool, open(args.output, "a+", encoding="utf-8") as out:
+        # Start on a fresh line if an interrupted run left a partial record
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n")
+        futures = {pool.submit(process_file, path, summarize, args.questions): path for path in todo}
+        for i, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            failures += "error" in record
+            status = f"error: {record['error']}" if "error" in record else f"{record['seconds']}s"
+            print(f"[{i}/{len(todo)}] {record['file']} {status}", flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
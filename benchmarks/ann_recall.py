@@ -0,0 +1,125 @@
+"""Measure the evaluator's IVF index against exact search: recall and latency.
+
+    python -m benchmarks.ann_recall --sentences 100000 --nprobe 1,4,8,16,32
+    python -m benchmarks.ann_recall --real-models --sentences 20000 --output ann.json
+
+Sentences come from the synthetic corpus; queries are further sentences
+that are not indexed, with a third of their words dropped, like a
+paraphrased user answer.
+Recall@1 is the share of queries whose IVF best match is the exact best
+match (ties on similarity count as hits).
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_text
+from modules.ann_index import IVFIndex
+
+
+def _sentences(count, seed):
+    sentences = []
+    text_seed = seed
+    while len(sentences) < count:
+        text = synthetic_text(count * 100, seed=text_seed)
+        sentences.extend(s.strip() + "." for s in text.split(".") if len(s.split()) >= 5)
+        text_seed += 1
+    return sentences[:count]
+
+
+def _encoder(real_models):
+    if real_models:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer("all-MiniLM-L6-v2")
+    from benchmarks.stubs import StubEncoder
+    return StubEncoder()
+
+
+def _queries(held_out, seed):
+    rng = random.Random(seed)
+    queries = []
+    for sentence in held_out:
+        words = sentence.rstrip(".").split()
+        kept = [w for w in words if rng.random() > 0.33] or words[:1]
+        queries.append(" ".join(kept))
+    return queries
+
+
+def run(n_sentences, nprobes, n_queries, nlist, real_models, seed):
+    encoder = _encoder(real_models)
+    sentences = _sentences(n_sentences + n_queries, seed)
+    # The last n_queries sentences are held out of the index and become queries
+    sentences, held_out = sentences[:n_sentences], sentences[n_sentences:]
+    embeddings = np.ascontiguousarray(
+        encoder.encode(sentences, convert_to_numpy=True, normalize_embeddings=True), dtype=np.float32)
+    queries = np.ascontiguousarray(
+        encoder.encode(_queries(held_out, seed), convert_to_numpy=True, normalize_embeddings=True),
+        dtype=np.float32)
+
+    start = time.perf_counter()
+    index = IVFIndex.build(embeddings, nlist=nlist, seed=seed)
+    build_seconds = time.perf_counter() - start
+
+    exact, exact_timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        similarities = embeddings @ query
+        best = int(similarities.argmax())
+        exact_timings.append(time.perf_counter() - start)
+        exact.append(float(similarities[best]))
+
+    results = []
+    for nprobe in nprobes:
+        hits, timings, scanned = 0, [], 0
+        for query, exact_similarity in zip(queries, exact):
+            start = time.perf_counter()
+            ids, similarities = index.search(embeddings, query, k=1, nprobe=nprobe)
+            timings.append(time.perf_counter() - start)
+            scanned += len(index.candidates(query, nprobe))
+            hits += bool(len(ids)) and similarities[0] >= exact_similarity - 1e-6
+        results.append({
+            "nprobe": nprobe,
+            "recall_at_1": hits / len(queries),
+            "median_ms": statistics.median(timings) * 1000,
+            "scanned_fraction": scanned / len(queries) / len(embeddings),
+        })
+    return {
+        "sentences": n_sentences,
+        "queries": n_queries,
+        "nlist": index.nlist,
+        "build_seconds": build_seconds,
+        "exact_median_ms": statistics.median(exact_timings) * 1000,
+        "ivf": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=100000, help="document size in sentences")
+    parser.add_argument("--nprobe", default="1,4,8,16,32", help="comma separated lists to probe per query")
+    parser.add_argument("--nlist", type=int, help="number of IVF lists (default: sqrt of sentences)")
+    parser.add_argument("--queries", type=int, default=200, help="queries to average over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--real-models", action="store_true", help="embed with the real MiniLM encoder")
+    parser.add_argument("--output", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.sentences, [int(n) for n in args.nprobe.split(",")], args.queries,
+                 args.nlist, args.real_models, args.seed)
+    print(f"{report['sentences']} sentences, nlist={report['nlist']}, build {report['build_seconds']:.2f}s, "
+          f"exact search {report['exact_median_ms']:.3f} ms")
+    for result in report["ivf"]:
+        print(f"nprobe {result['nprobe']:>4}  recall@1 {result['recall_at_1']:.3f}  "
+              f"{result['median_ms']:.3f} ms  scanned {result['scanned_fraction']:.1%}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import random
+
+WORDS = (
+    "model data analysis result method study sample effect measure value system "
+    "process network signal energy growth rate control group test average level "
+    "structure function response pattern source increase decrease observed reported "
+    "significant experiment theory evidence factor performance training baseline"
+).split()
+
+# Characters of text per generated PDF page
+PAGE_CHARS = 3000
+LINE_CHARS = 80
+
+
+def parse_size(size: str) -> int:
+    """Parse sizes like 10KB, 1MB or 512 into bytes"""
+    size = size.strip().upper()
+    for suffix, factor in (("KB", 1024), ("MB", 1024 * 1024), ("B", 1)):
+        if size.endswith(suffix):
+            return int(float(size[:-len(suffix)]) * factor)
+    return int(size)
+
+
+def synthetic_text(size_bytes: int, seed: int = 0) -> str:
+    """Deterministic prose-like text of roughly size_bytes characters"""
+    rng = random.Random(seed)
+    sentences, length = [], 0
+    while length < size_bytes:
+        words = rng.choices(WORDS, k=rng.randint(8, 20))
+        sentence = " ".join(words).capitalize() + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+        if rng.random() < 0.1:
+            sentences.append("\n\n")
+    return " ".join(sentences)[:size_bytes]
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(text: str) -> bytes:
+    """Write text into a minimal multi-page PDF using the built-in Helvetica font"""
+    pages = [text[i:i + PAGE_CHARS] for i in range(0, len(text), PAGE_CHARS)] or [""]
+    n = len(pages)
+    font_id = 3 + 2 * n
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(n)), n),
+    ]
+    for i, page in enumerate(pages):
+        page = page.replace("\n", " ")
+        lines = [_pdf_escape(page[j:j + LINE_CHARS]) for j in range(0, len(page), LINE_CHARS)]
+        content = "BT /F1 9 Tf 11 TL 40 760 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+class BenchFile:
+    """Minimal stand-in for a Streamlit UploadedFile"""
+
+    def __init__(self, name: str, file_type: str, data: bytes):
+        self.name = name
+        self.type = file_type
+        self.size = len(data)
+        self._data = data
+
+    def getvalue(self) -> bytes:
+        return self._data
+
+
+def make_file(file_format: str, size_bytes: int, seed: int = 0) -> BenchFile:
+    text = synthetic_text(size_bytes, seed)
+    if file_format == "pdf":
+        return BenchFile(f"bench_{size_bytes}.pdf", "application/pdf", make_pdf(text))
+    return BenchFile(f"bench_{size_bytes}.txt", "text/plain", text.encode("utf-8"))
@@ -0,0 +1,101 @@
+"""Check ONNX Runtime outputs against PyTorch and compare their latency.
+
+    python -m benchmarks.onnx_parity
+    python -m benchmarks.onnx_parity --quantize --output onnx_parity.json
+
+For the QA reader it reports how often the answer span matches and the
+largest score difference; for the MiniLM encoder the cosine similarity
+between the two backends' embeddings. Latency is the median of --repeat
+runs over the same inputs.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_text
+
+QUESTIONS = [
+    "What was the observed effect?",
+    "Which method was used?",
+    "What increased during the experiment?",
+    "What did the study report about performance?",
+]
+
+
+def _median_seconds(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def qa_parity(quantize, repeat):
+    from transformers import pipeline
+
+    from modules.onnx_backend import QA_MODEL_ID, load_onnx_qa_pipeline
+
+    torch_qa = pipeline("question-answering", model=QA_MODEL_ID)
+    onnx_qa = load_onnx_qa_pipeline(quantize=quantize)
+    inputs = [{"question": q, "context": synthetic_text(1500, seed=i)} for i, q in enumerate(QUESTIONS)]
+
+    torch_out = torch_qa(inputs)
+    onnx_out = onnx_qa(inputs)
+    span_matches = sum((t["start"], t["end"]) == (o["start"], o["end"]) for t, o in zip(torch_out, onnx_out))
+    return {
+        "span_match_rate": span_matches / len(inputs),
+        "max_score_diff": max(abs(t["score"] - o["score"]) for t, o in zip(torch_out, onnx_out)),
+        "torch_seconds": _median_seconds(lambda: torch_qa(inputs), repeat),
+        "onnx_seconds": _median_seconds(lambda: onnx_qa(inputs), repeat),
+    }
+
+
+def encoder_parity(quantize, repeat):
+    from sentence_transformers import SentenceTransformer
+
+    from modules.onnx_backend import OnnxSentenceEncoder
+
+    torch_encoder = SentenceTransformer("all-MiniLM-L6-v2")
+    onnx_encoder = OnnxSentenceEncoder(quantize=quantize)
+    sentences = [s.strip() + "." for s in synthetic_text(20000).split(".") if s.strip()][:256]
+
+    torch_emb = torch_encoder.encode(sentences, convert_to_numpy=True, normalize_embeddings=True)
+    onnx_emb = onnx_encoder.encode(sentences, normalize_embeddings=True)
+    cosines = np.sum(torch_emb * onnx_emb, axis=1)
+    return {
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "torch_seconds": _median_seconds(lambda: torch_encoder.encode(sentences), repeat),
+        "onnx_seconds": _median_seconds(lambda: onnx_encoder.encode(sentences), repeat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantize", action="store_true", help="compare against the dynamic int8 ONNX models")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per backend")
+    parser.add_argument("--output", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    report = {
+        "backend": "onnx-int8" if args.quantize else "onnx",
+        "qa": qa_parity(args.quantize, args.repeat),
+        "encoder": encoder_parity(args.quantize, args.repeat),
+    }
+    for name in ("qa", "encoder"):
+        result = report[name]
+        speedup = result["torch_seconds"] / result["onnx_seconds"] if result["onnx_seconds"] else float("inf")
+        details = ", ".join(f"{k}={v:.4f}" for k, v in result.items())
+        print(f"{name:<8} {details}, speedup={speedup:.2f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
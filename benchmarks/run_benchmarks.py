@@ -0,0 +1,163 @@
+"""Time every document pipeline stage against synthetic corpora of growing size.
+
+    python -m benchmarks.run_benchmarks --sizes 10KB,100KB,1MB,10MB --output results.json
+    python -m benchmarks.run_benchmarks --real-models --sizes 10KB,100KB
+    python -m benchmarks.run_benchmarks --compare baseline.json --output results.json
+
+Stub models are used by default so the suite runs offline (e.g. in CI). Each
+run uses a fresh cache directory and every timed repeat gets content no cache
+has seen, so the reported medians are cold. One extra call on the same input
+is reported separately as the warm (cached) time.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import make_file, parse_size
+
+STAGES = ["extract_text_from_file", "summarize_text", "answer_question", "generate_questions", "evaluate_answer"]
+QUESTION = "What was the observed effect of the method on performance?"
+ANSWER = "The method increased performance compared with the baseline."
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _time_call(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def run(sizes, formats, stages, repeat, real_models):
+    # Imported late so the modules pick up the temporary cache directory
+    from modules.evaluator import evaluate_answer
+    from modules.file_handler import extract_text_from_file
+    from modules.qa_module import answer_question
+    from modules.question_gen import generate_questions
+    from modules.summarizer import summarize_text
+
+    if not real_models:
+        from benchmarks.stubs import install_stub_models
+        install_stub_models()
+
+    results = []
+    for file_format in formats:
+        for size in sizes:
+            size_bytes = parse_size(size)
+            text = extract_text_from_file(make_file(file_format, size_bytes))
+            calls = {
+                "extract_text_from_file": extract_text_from_file,
+                "summarize_text": summarize_text,
+                "answer_question": lambda doc: answer_question(QUESTION, doc),
+                "generate_questions": generate_questions,
+                "evaluate_answer": lambda doc: evaluate_answer(ANSWER, doc),
+            }
+            for stage in stages:
+                # Every repeat gets unseen content so no cache can answer it;
+                # building the inputs is not timed
+                if stage == "extract_text_from_file":
+                    inputs = [make_file(file_format, size_bytes, seed=100 + i) for i in range(repeat)]
+                else:
+                    inputs = [f"Benchmark run {i}. {text}" for i in range(repeat)]
+                timings = [_time_call(calls[stage], item) for item in inputs]
+                warm = _time_call(calls[stage], inputs[-1])
+                result = {
+                    "stage": stage,
+                    "format": file_format,
+                    "size": size,
+                    "size_bytes": size_bytes,
+                    "input_chars": len(text),
+                    "cold_median_seconds": statistics.median(timings),
+                    "cold_max_seconds": max(timings),
+                    "warm_seconds": warm,
+                }
+                results.append(result)
+                print(f"{stage:<24} {file_format:<4} {size:>6}  cold median {result['cold_median_seconds']:.4f}s  "
+                      f"warm {result['warm_seconds']:.4f}s", flush=True)
+    return results
+
+
+def compare(results, baseline_path):
+    """Print the cold median-time ratio of each result against a previous run"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["stage"], r["format"], r["size"]): r for r in json.load(f)["results"]}
+    print("\nstage                    fmt    size   baseline    current   ratio  (cold medians)")
+    for r in results:
+        old = baseline.get((r["stage"], r["format"], r["size"]))
+        if old is None or "cold_median_seconds" not in old:
+            # Older reports only had warm medians, which are not comparable
+            continue
+        ratio = r["cold_median_seconds"] / old["cold_median_seconds"] if old["cold_median_seconds"] else float("inf")
+        print(f"{r['stage']:<24} {r['format']:<4} {r['size']:>6}  {old['cold_median_seconds']:9.4f}s "
+              f"{r['cold_median_seconds']:9.4f}s  {ratio:5.2f}x")
+
+
+def _check_nltk_data():
+    """Exit with setup instructions when the real pipeline's Punkt data is missing"""
+    import nltk
+
+    try:
+        nltk.data.find("tokenizers/punkt_tab")
+    except LookupError:
+        sys.exit("--real-models needs NLTK's punkt_tab data; install it with: python -m nltk.downloader punkt_tab")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10KB,100KB,1MB,10MB", help="comma separated corpus sizes")
+    parser.add_argument("--formats", default="txt,pdf", help="comma separated: txt, pdf")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated stages to run")
+    parser.add_argument("--repeat", type=int, default=3, help="cold timed calls per stage, each on fresh content")
+    parser.add_argument("--real-models", action="store_true", help="use the real Hugging Face models")
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    if args.real_models:
+        _check_nltk_data()
+
+    with tempfile.TemporaryDirectory(prefix="smart_assistant_bench_") as cache_root:
+        os.environ["SMART_ASSISTANT_CACHE_DIR"] = cache_root
+        results = run(
+            [s.strip() for s in args.sizes.split(",") if s.strip()],
+            [f.strip() for f in args.formats.split(",") if f.strip()],
+            stages,
+            max(args.repeat, 1),
+            args.real_models,
+        )
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "models": "real" if args.real_models else "stub",
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Lightweight stand-ins for the Hugging Face models, so benchmarks run offline.
+
+Each stub mimics the call signature and output shape the modules rely on,
+with cost that scales with input size the way the surrounding code does.
+"""
+import hashlib
+import re
+
+import numpy as np
+
+from modules import model_registry
+
+_WORD_RE = re.compile(r"\w+")
+# A sentence runs to the first ., ! or ? followed by whitespace, or to the end
+_SENTENCE_RE = re.compile(r"\S.*?(?:[.!?](?=\s|$)|$)", re.DOTALL)
+
+
+class StubTokenizer:
+    def __call__(self, text, add_special_tokens=True, **kwargs):
+        return {"input_ids": list(range(len(text.split())))}
+
+
+class StubSummarizer:
+    """First sentence of every input, trimmed to max_length words"""
+
+    tokenizer = StubTokenizer()
+
+    def __call__(self, texts, max_length=150, min_length=0, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else texts
+        results = [{"summary_text": " ".join(text.split(".")[0].split()[:max_length]) + "."} for text in texts]
+        return results[0] if single else results
+
+
+class StubQA:
+    """Picks the context word that appears in the question, scored by overlap"""
+
+    def _answer(self, question, context):
+        terms = set(_WORD_RE.findall(question.lower()))
+        best = None
+        for match in _WORD_RE.finditer(context):
+            if match.group().lower() in terms:
+                best = match
+                break
+        if best is None:
+            return {"answer": "", "score": 0.0, "start": 0, "end": 0}
+        return {"answer": best.group(), "score": 0.5, "start": best.start(), "end": best.end()}
+
+    def __call__(self, inputs=None, question=None, context=None, **kwargs):
+        if inputs is None:
+            return self._answer(question, context)
+        if isinstance(inputs, dict):
+            return self._answer(inputs["question"], inputs["context"])
+        return [self._answer(item["question"], item["context"]) for item in inputs]
+
+
+class StubGenerator:
+    """Appends numbered questions built from the prompt's own words"""
+
+    def __call__(self, prompt, num_return_sequences=1, return_full_text=True, **kwargs):
+        words = _WORD_RE.findall(prompt)[-40:] or ["document"]
+        # The prompt ends with "1.", so the continuation starts with the first question
+        continuation = " " + "\n".join(
+            f"{i}. How is {words[(3 * i) % len(words)]} related to {words[(3 * i + 1) % len(words)]}?" for i in range(1, 6)
+        )[3:]
+        text = prompt + continuation if return_full_text else continuation
+        return [{"generated_text": text} for _ in range(num_return_sequences)]
+
+
+class StubEncoder:
+    """Hashed bag-of-words embeddings with the MiniLM output shape"""
+
+    dimension = 384
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def _embed(self, sentence):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in _WORD_RE.findall(sentence.lower()):
+            bucket = int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.dimension
+            vector[bucket] += 1.0
+        return vector
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        matrix = np.stack([self._embed(s) for s in ([sentences] if single else sentences)])
+        if normalize_embeddings:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        return matrix[0] if single else matrix
+
+
+class StubSentenceTokenizer:
+    """Regex stand-in for NLTK's Punkt, which needs the punkt_tab data download"""
+
+    def span_tokenize(self, text):
+        for match in _SENTENCE_RE.finditer(text):
+            yield match.span()
+
+
+def install_stub_models():
+    """Register the stubs in the model registry for this process"""
+    from modules import sentence_index, summarizer
+
+    sentence_index.PunktTokenizer = StubSentenceTokenizer
+    summarizer.PunktTokenizer = StubSentenceTokenizer
+    model_registry.set_model("summarizer", StubSummarizer())
+    model_registry.set_model("qa", StubQA())
+    model_registry.set_model("generator", StubGenerator())
+    model_registry.set_model("encoder", StubEncoder())
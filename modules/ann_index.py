@@ -0,0 +1,113 @@
+"""Inverted-file (IVF) index for approximate nearest-neighbour search over embeddings.
+
+Embeddings are clustered with spherical k-means into nlist lists. A query
+is compared with the centroids first and then only with the embeddings in
+its nprobe closest lists, so cost grows with nprobe * n / nlist instead of
+n. Raising nprobe trades latency for recall; nprobe == nlist is exact.
+"""
+import math
+import os
+import tempfile
+
+import numpy as np
+
+# Searches over fewer embeddings than this are done exactly
+ANN_MIN_SIZE = int(os.getenv("SMART_ASSISTANT_ANN_MIN_SIZE", "20000"))
+NPROBE = int(os.getenv("SMART_ASSISTANT_ANN_NPROBE", "16"))
+KMEANS_ITERATIONS = 10
+# k-means is trained on a sample of this many points per list
+TRAINING_POINTS_PER_LIST = 64
+# Rows per matrix product when assigning embeddings, to bound memory
+ASSIGN_CHUNK = 16384
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _assign(embeddings, centroids):
+    """Closest centroid of every row, by cosine similarity"""
+    labels = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), ASSIGN_CHUNK):
+        labels[start:start + ASSIGN_CHUNK] = np.argmax(embeddings[start:start + ASSIGN_CHUNK] @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(embeddings, nlist, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means on a sample of the embeddings"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(embeddings), nlist * TRAINING_POINTS_PER_LIST)
+    sample = np.asarray(embeddings[np.sort(rng.choice(len(embeddings), sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+        # Re-seed empty lists with random sample points
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = _normalize(sums).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """Embeddings grouped by closest centroid, searched list by list"""
+
+    def __init__(self, centroids, list_offsets, list_ids):
+        self.centroids = centroids
+        # Ids of list i are list_ids[list_offsets[i]:list_offsets[i + 1]]
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+
+    @classmethod
+    def build(cls, embeddings, nlist=None, seed=0) -> "IVFIndex":
+        nlist = min(nlist or max(int(math.sqrt(len(embeddings))), 1), len(embeddings))
+        centroids = train_centroids(embeddings, nlist, seed=seed)
+        labels = _assign(embeddings, centroids)
+        list_ids = np.argsort(labels, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))])
+        return cls(centroids, list_offsets, list_ids)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def candidates(self, query_embedding, nprobe=NPROBE):
+        """Ids of the embeddings in the nprobe lists closest to the query"""
+        nprobe = min(nprobe, self.nlist)
+        closest = np.argpartition(-(self.centroids @ query_embedding), nprobe - 1)[:nprobe]
+        return np.concatenate([self.list_ids[self.list_offsets[i]:self.list_offsets[i + 1]] for i in closest])
+
+    def search(self, embeddings, query_embedding, k=1, nprobe=NPROBE):
+        """Approximate top-k (ids, similarities) among the rows of embeddings, best first"""
+        # Sorted ids read memory-mapped embeddings sequentially
+        ids = np.sort(self.candidates(query_embedding, nprobe))
+        if not len(ids):
+            return ids, np.zeros(0, dtype=np.float32)
+        similarities = embeddings[ids] @ query_embedding
+        top = np.argsort(-similarities)[:k]
+        return ids[top], similarities[top]
+
+    def save(self, directory):
+        # Each file is replaced atomically and the centroids, which load() checks
+        # for, come last, so readers never see a partly written index
+        for name, array in (("ivf_offsets.npy", self.list_offsets), ("ivf_ids.npy", self.list_ids),
+                            ("ivf_centroids.npy", self.centroids)):
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npy.tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, os.path.join(directory, name))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        path = os.path.join(directory, "ivf_centroids.npy")
+        if not os.path.exists(path):
+            return None
+        mmap_mode = "r" if mmap else None
+        return cls(
+            np.load(path),
+            np.load(os.path.join(directory, "ivf_offsets.npy")),
+            np.load(os.path.join(directory, "ivf_ids.npy"), mmap_mode=mmap_mode),
+        )
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Shared on-disk cache location, can be moved with SMART_ASSISTANT_CACHE_DIR
+CACHE_ROOT = os.getenv(
+    "SMART_ASSISTANT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"),
+)
+
+
+def cache_dir(name: str) -> str:
+    """Return (and create) a named directory under the cache root"""
+    path = os.path.join(CACHE_ROOT, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def content_hash(data) -> str:
+    """Stable SHA-256 hex digest for document text or raw file bytes"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory mapping that evicts the least recently used key"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    """Size-bounded key/value store in SQLite with least-recently-used eviction.
+
+    Every process pointing at the same cache directory shares the entries.
+    Values must be JSON serializable.
+    """
+
+    def __init__(self, name: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = os.path.join(cache_dir(name), "cache.sqlite3")
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL, accessed REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return _closing(conn)
+
+    def get(self, key: str, default=None, ttl: float = None):
+        """Return the stored value, or default if missing or older than ttl seconds"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            if ttl is not None and time.time() - row[1] > ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return default
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            # Drop the least recently used entries that push the total over the budget
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS running"
+                " FROM entries) WHERE running > ?)",
+                (self.max_bytes,),
+            )
+
+    def delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def __contains__(self, key: str):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+
+@contextmanager
+def _closing(conn):
+    """Commit on success, roll back on error, and always close the connection"""
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,87 @@
+import os
+
+import streamlit as st
+
+from modules.retriever import get_passage_index
+
+# Document tokens sent with each cloud prompt
+CONTEXT_TOKENS = int(os.getenv("OPENROUTER_CONTEXT_TOKENS", "1000"))
+# Ranked passages considered before giving up on filling the budget
+MAX_CANDIDATES = 64
+SEPARATOR = "\n…\n"
+# GPT-2 averages about 4 characters per token on English prose
+CHARS_PER_TOKEN = 4
+
+
+@st.cache_resource
+def _load_tokenizer():
+    # GPT-2's BPE is a close enough proxy for the hosted model's tokenizer
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained("gpt2")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Approximate model tokens in text, ~4 characters per token without a tokenizer"""
+    tokenizer = _load_tokenizer()
+    if tokenizer is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"])
+
+
+def _ranked_passages(index, query):
+    """Passage ids, most relevant first; evenly spread over the document without a query"""
+    ranked = [pid for pid, _ in index.search(query, MAX_CANDIDATES)] if query else []
+    if ranked:
+        return ranked
+    n = len(index)
+    step = max(n // MAX_CANDIDATES, 1)
+    # Interleave so any prefix of the list covers the whole document
+    spread = list(range(0, n, step))
+    order, seen = [], set()
+    stride = len(spread)
+    while stride >= 1:
+        for pid in spread[::stride]:
+            if pid not in seen:
+                seen.add(pid)
+                order.append(pid)
+        stride //= 2
+    return order
+
+
+def build_context(document: str, query: str = "", budget: int = CONTEXT_TOKENS) -> str:
+    """Passages most relevant to query, in document order, within a token budget"""
+    # Only short documents are tokenized whole; longer ones are assumed over budget
+    # so the cost per call stays proportional to the budget, not the document
+    if len(document) <= budget * CHARS_PER_TOKEN and count_tokens(document) <= budget:
+        return document
+
+    index = get_passage_index(document)
+    selected = []
+    used = 0
+    for pid in _ranked_passages(index, query):
+        start, end = index.spans[pid]
+        # Overlapping passages only cost their new characters
+        covered = sum(max(0, min(end, e) - max(start, s)) for s, e in selected)
+        if covered >= end - start:
+            continue
+        cost = count_tokens(index.passage_text(pid)) * (end - start - covered) / (end - start)
+        if used + cost > budget:
+            break
+        selected.append((start, end))
+        used += cost
+
+    if not selected:
+        # Not even one passage fits: fall back to the start of the best one
+        start, end = index.spans[_ranked_passages(index, query)[0]]
+        return document[start:start + budget * CHARS_PER_TOKEN]
+
+    merged = []
+    for start, end in sorted(selected):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return SEPARATOR.join(document[start:end] for start, end in merged)
@@ -0,0 +1,238 @@
+"""Multi-document corpus with one persistent index shard per document.
+
+Each shard holds the document text, its BM25 passage postings and the
+passage embeddings. Adding a document writes one new shard and updates the
+manifest, so existing shards are never rebuilt. Queries combine lexical
+(BM25 with corpus-wide statistics) and embedding rankings with reciprocal
+rank fusion.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import streamlit as st
+
+from modules.cache import cache_dir, content_hash
+from modules.metrics import traced
+from modules.model_registry import get_model
+from modules.retriever import PassageIndex, bm25_idf, tokenize
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Name of the corpus shared by the app's corpus mode
+DEFAULT_CORPUS = os.getenv("SMART_ASSISTANT_CORPUS", "default")
+# Reciprocal rank fusion constant
+RRF_K = 60
+# Candidates taken from each ranking before fusion
+CANDIDATES_PER_RANKING = 50
+
+
+class CorpusShard:
+    """Passage index and embeddings of one document in the corpus"""
+
+    def __init__(self, doc_id, name, index: PassageIndex, embeddings):
+        self.doc_id = doc_id
+        self.name = name
+        self.index = index
+        self.embeddings = embeddings
+
+    def save(self, directory):
+        parent = os.path.dirname(directory)
+        tmp_dir = tempfile.mkdtemp(dir=parent)
+        with open(os.path.join(tmp_dir, "text.txt"), "w", encoding="utf-8") as f:
+            f.write(self.index.text)
+        with open(os.path.join(tmp_dir, "passages.json"), "w", encoding="utf-8") as f:
+            json.dump({"name": self.name, "spans": self.index.spans, "lengths": self.index.lengths,
+                       "postings": self.index.postings}, f)
+        np.save(os.path.join(tmp_dir, "embeddings.npy"), self.embeddings)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "text.txt"), encoding="utf-8") as f:
+            text = f.read()
+        with open(os.path.join(directory, "passages.json"), encoding="utf-8") as f:
+            parts = json.load(f)
+        index = PassageIndex.from_parts(text, parts["spans"], parts["lengths"], parts["postings"])
+        embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+        return cls(os.path.basename(directory), parts["name"], index, embeddings)
+
+
+class CorpusIndex:
+    """Persistent, incrementally growing index over many documents"""
+
+    def __init__(self, name: str = DEFAULT_CORPUS):
+        self.directory = cache_dir(os.path.join("corpus", name))
+        self.shard_dir = cache_dir(os.path.join("corpus", name, "shards"))
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        self._lock = threading.Lock()
+        self._shards = {}
+        # In-memory copy of manifest.json, re-read only when another process changes it
+        self._documents = []
+        self._doc_ids = set()
+        self._manifest_mtime = None
+
+    def _refresh_manifest(self):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._manifest_mtime:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self._documents = json.load(f)["documents"]
+            self._doc_ids = {doc["doc_id"] for doc in self._documents}
+            self._manifest_mtime = mtime
+
+    def manifest(self) -> list:
+        """Per-document metadata: doc_id, name, chars and passages"""
+        self._refresh_manifest()
+        return list(self._documents)
+
+    @contextmanager
+    def _manifest_lock(self):
+        """Lock the manifest against other processes (e.g. replicas) and re-read it.
+
+        The caller holds self._lock, which covers the threads of this process.
+        """
+        with open(os.path.join(self.directory, "manifest.lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # mtimes can be too coarse to show a change made just before
+                self._manifest_mtime = None
+                self._refresh_manifest()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_manifest(self, documents):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"documents": documents}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+        self._documents = documents
+        self._doc_ids = {doc["doc_id"] for doc in documents}
+        self._manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+
+    def __contains__(self, doc_id):
+        self._refresh_manifest()
+        return doc_id in self._doc_ids
+
+    def __len__(self):
+        self._refresh_manifest()
+        return len(self._documents)
+
+    @traced("corpus.add_document")
+    def add_document(self, name: str, text: str) -> str:
+        """Index one document as a new shard; documents already present are skipped"""
+        doc_id = content_hash(text)
+        with self._lock:
+            if doc_id in self:
+                return doc_id
+            index = PassageIndex(text)
+            passages = [index.passage_text(pid) for pid in range(len(index))]
+            encoder = get_model("encoder")
+            if passages:
+                embeddings = encoder.encode(passages, convert_to_numpy=True, normalize_embeddings=True)
+            else:
+                embeddings = np.zeros((0, encoder.get_sentence_embedding_dimension()))
+            shard = CorpusShard(doc_id, name, index, np.ascontiguousarray(embeddings, dtype=np.float32))
+            shard.save(os.path.join(self.shard_dir, doc_id))
+            self._shards[doc_id] = shard
+
+            # Another process may have added documents since the manifest was read
+            with self._manifest_lock():
+                if doc_id not in self._doc_ids:
+                    documents = list(self._documents)
+                    documents.append({"doc_id": doc_id, "name": name, "chars": len(text), "passages": len(index)})
+                    self._write_manifest(documents)
+        return doc_id
+
+    def shards(self):
+        for doc in self.manifest():
+            if doc["doc_id"] not in self._shards:
+                self._shards[doc["doc_id"]] = CorpusShard.load(os.path.join(self.shard_dir, doc["doc_id"]))
+            yield self._shards[doc["doc_id"]]
+
+    @traced("corpus.search")
+    def search(self, query: str, top_k: int = 5) -> list:
+        """Top passages across all documents, with source document and offsets"""
+        shards = list(self.shards())
+        if not shards:
+            return []
+
+        # Corpus-wide BM25 statistics for just the query terms
+        n_passages = sum(len(shard.index) for shard in shards)
+        avg_length = sum(sum(shard.index.lengths) for shard in shards) / max(n_passages, 1)
+        idf = {}
+        for term in set(tokenize(query)):
+            df = sum(len(shard.index.postings.get(term, ())) for shard in shards)
+            if df:
+                idf[term] = bm25_idf(n_passages, df)
+
+        lexical = []
+        for shard in shards:
+            lexical.extend(((shard, pid), score) for pid, score in shard.index.scores(query, idf, avg_length).items())
+        lexical.sort(key=lambda item: item[1], reverse=True)
+
+        query_embedding = get_model("encoder").encode(query, convert_to_numpy=True, normalize_embeddings=True)
+        semantic = []
+        for shard in shards:
+            if len(shard.embeddings):
+                similarities = np.asarray(shard.embeddings @ query_embedding.astype(np.float32))
+                best = np.argsort(-similarities)[:CANDIDATES_PER_RANKING]
+                semantic.extend(((shard, int(pid)), float(similarities[pid])) for pid in best)
+        semantic.sort(key=lambda item: item[1], reverse=True)
+
+        fused = {}
+        for ranking in (lexical[:CANDIDATES_PER_RANKING], semantic[:CANDIDATES_PER_RANKING]):
+            for rank, (key, _) in enumerate(ranking):
+                fused_key = (key[0].doc_id, key[1])
+                score, shard = fused.get(fused_key, (0.0, key[0]))
+                fused[fused_key] = (score + 1.0 / (RRF_K + rank + 1), shard)
+
+        hits = []
+        for (doc_id, pid), (score, shard) in sorted(fused.items(), key=lambda item: item[1][0], reverse=True)[:top_k]:
+            start, end = shard.index.spans[pid]
+            hits.append({"doc_id": doc_id, "name": shard.name, "start": start, "end": end,
+                         "text": shard.index.passage_text(pid), "score": score})
+        return hits
+
+
+@st.cache_resource
+def get_corpus(name: str = DEFAULT_CORPUS) -> CorpusIndex:
+    """Corpus index shared by all sessions of this process"""
+    return CorpusIndex(name)
+
+
+@traced("answer_corpus_question")
+def answer_corpus_question(question: str, corpus: CorpusIndex, top_k: int = 5) -> dict:
+    """Run the QA reader over the best passages of the whole corpus and cite the source"""
+    hits = corpus.search(question, top_k)
+    if not question.strip() or not hits:
+        return {"answer": "❌ No matching passages in the corpus", "score": 0, "sources": hits}
+
+    responses = get_model("qa")([{"question": question, "context": hit["text"]} for hit in hits], batch_size=top_k)
+    if isinstance(responses, dict):
+        responses = [responses]
+    best_hit, best = max(zip(hits, responses), key=lambda pair: pair[1]["score"])
+    return {
+        "answer": best["answer"],
+        "score": best["score"],
+        "doc_id": best_hit["doc_id"],
+        "name": best_hit["name"],
+        "start": best_hit["start"] + best["start"],
+        "end": best_hit["start"] + best["end"],
+        "sources": hits,
+    }
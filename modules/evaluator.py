@@ -1,22 +1,175 @@
-from sentence_transformers import SentenceTransformer, util
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+import numpy as np
 
-def evaluate_answer(user_answer: str, document: str) -> str:
-    # Break document into sentences
-    from nltk.tokenize import sent_tokenize
-    doc_sentences = sent_tokenize(document)
+from modules.ann_index import ANN_MIN_SIZE, NPROBE, IVFIndex
+from modules.cache import cache_dir, content_hash
+from modules.metrics import traced
+from modules import model_registry
+from modules.model_registry import get_model
+from modules.sentence_index import get_sentence_index
+
+# Number of document indexes kept in memory per process
+MAX_LOADED_INDEXES = 8
+# Disk budget for saved indexes; least recently used ones are removed beyond it
+DOC_INDEX_MAX_BYTES = int(os.getenv("SMART_ASSISTANT_DOC_INDEX_MAX_MB", "2048")) * 1024 * 1024
+
+_loaded_indexes = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+class DocumentIndex:
+    """Sentence embeddings for one document, stored as a contiguous float32 matrix"""
+
+    def __init__(self, doc_hash, sentences, offsets, embeddings, ann=None):
+        self.doc_hash = doc_hash
+        self.sentences = sentences
+        # (n, 2) array of [start, end) character offsets, shared with SentenceIndex
+        self.offsets = offsets
+        # (n, dim) L2-normalized embeddings, so a dot product is the cosine similarity
+        self.embeddings = embeddings
+        # IVF index for documents with at least ANN_MIN_SIZE sentences
+        self.ann = ann
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def similarities(self, query_embedding):
+        return self.embeddings @ query_embedding
+
+    def best_match(self, query_embedding, nprobe=NPROBE):
+        """(sentence id, similarity) of the closest sentence, approximate for large documents"""
+        if self.ann is not None:
+            ids, similarities = self.ann.search(self.embeddings, query_embedding, k=1, nprobe=nprobe)
+            if len(ids):
+                return int(ids[0]), float(similarities[0])
+        similarities = self.similarities(query_embedding)
+        best = int(similarities.argmax())
+        return best, float(similarities[best])
+
+    def save(self, directory):
+        # Write into a temp dir first so a half-written index is never picked up
+        parent = os.path.dirname(directory)
+        tmp_dir = tempfile.mkdtemp(dir=parent)
+        np.save(os.path.join(tmp_dir, "embeddings.npy"), np.ascontiguousarray(self.embeddings))
+        np.save(os.path.join(tmp_dir, "offsets.npy"), self.offsets)
+        with open(os.path.join(tmp_dir, "sentences.json"), "w", encoding="utf-8") as f:
+            json.dump(self.sentences, f)
+        if self.ann is not None:
+            self.ann.save(tmp_dir)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Another process saved the same document first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mmap_mode = "r" if mmap else None
+        embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode=mmap_mode)
+        offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode=mmap_mode)
+        with open(os.path.join(directory, "sentences.json"), encoding="utf-8") as f:
+            sentences = json.load(f)
+        ann = IVFIndex.load(directory, mmap=mmap)
+        if ann is None and len(embeddings) >= ANN_MIN_SIZE:
+            # Index saved before the ANN option, or with a higher threshold;
+            # save the IVF lists so later loads skip k-means
+            ann = IVFIndex.build(embeddings)
+            try:
+                ann.save(directory)
+            except OSError:
+                # Read-only or full cache dir: keep the in-memory index for this process
+                pass
+        return cls(os.path.basename(directory), sentences, offsets, embeddings, ann)
+
+
+def build_document_index(document: str, doc_hash: str = None) -> DocumentIndex:
+    """Embed every sentence of a document in one pass"""
+    doc_hash = doc_hash or content_hash(document)
+    model = get_model("encoder")
+    sentence_index = get_sentence_index(document)
+    sentences = sentence_index.sentences()
+    if sentences:
+        embeddings = model.encode(sentences, convert_to_numpy=True, normalize_embeddings=True)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    else:
+        embeddings = np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    ann = IVFIndex.build(embeddings) if len(embeddings) >= ANN_MIN_SIZE else None
+    return DocumentIndex(doc_hash, sentences, sentence_index.offsets, embeddings, ann)
 
-    # Embed user answer and all document sentences
-    user_embedding = model.encode(user_answer, convert_to_tensor=True)
-    doc_embeddings = model.encode(doc_sentences, convert_to_tensor=True)
 
-    # Compute similarity
-    similarities = util.pytorch_cos_sim(user_embedding, doc_embeddings)[0]
-    max_sim = float(similarities.max())
+def _index_key(doc_hash: str) -> str:
+    # Embeddings from another encoder or backend are not interchangeable
+    encoder = content_hash(f"{model_registry.MODEL_IDS['encoder']}:{model_registry.BACKEND}")[:12]
+    return f"{doc_hash}-{encoder}"
+
+
+def _directory_size(directory) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+
+def evict_document_indexes(root: str, max_bytes: int = DOC_INDEX_MAX_BYTES, keep: str = None):
+    """Remove the least recently used saved indexes until the total fits max_bytes"""
+    entries = []
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.name != keep and not entry.name.startswith("tmp"):
+            entries.append((entry.stat().st_mtime, entry.path, _directory_size(entry.path)))
+    total = sum(size for _, _, size in entries)
+    if keep and os.path.isdir(os.path.join(root, keep)):
+        total += _directory_size(os.path.join(root, keep))
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def get_document_index(document: str) -> DocumentIndex:
+    """Return the index for a document, from memory, disk, or by building it once"""
+    key = _index_key(content_hash(document))
+    with _loaded_lock:
+        if key in _loaded_indexes:
+            _loaded_indexes.move_to_end(key)
+            return _loaded_indexes[key]
+
+    root = cache_dir("doc_index")
+    directory = os.path.join(root, key)
+    if os.path.isdir(directory):
+        index = DocumentIndex.load(directory)
+        # The directory's mtime is its last use for eviction
+        now = time.time()
+        os.utime(directory, (now, now))
+    else:
+        index = build_document_index(document, key)
+        index.save(directory)
+        evict_document_indexes(root, keep=key)
+
+    with _loaded_lock:
+        _loaded_indexes[key] = index
+        _loaded_indexes.move_to_end(key)
+        while len(_loaded_indexes) > MAX_LOADED_INDEXES:
+            _loaded_indexes.popitem(last=False)
+    return index
+
+
+@traced("evaluate_answer")
+def evaluate_answer(user_answer: str, document: str) -> str:
+    index = get_document_index(document)
+    if not len(index):
+        return "❌ No strong semantic match in the document."
+
+    # Only the answer is encoded per call; the document side comes from the index
+    user_embedding = get_model("encoder").encode(user_answer, convert_to_numpy=True, normalize_embeddings=True)
+    best, max_sim = index.best_match(user_embedding.astype(np.float32))
 
     if max_sim > 0.6:
-        matched_sentence = doc_sentences[int(similarities.argmax())]
+        matched_sentence = index.sentences[best]
         return f"✅ Match found. Closest sentence: *{matched_sentence}* (Score: {round(max_sim, 2)})"
     else:
         return "❌ No strong semantic match in the document."
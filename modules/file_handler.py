@@ -1,9 +1,162 @@
+import csv
+import logging
+import multiprocessing
+from io import BytesIO, StringIO
+
 from pdfminer.high_level import extract_text
+from pdfminer.pdfpage import PDFPage
 
-def extract_text_from_file(file):
-    if file.type == "application/pdf":
-        return extract_text(file)
-    elif file.type == "text/plain":
-        return file.read().decode("utf-8")
+from modules.cache import DiskCache, content_hash
+from modules.metrics import traced
+
+logger = logging.getLogger(__name__)
+
+# Extracted PDF text keyed by a hash of the file bytes, shared by all sessions
+extraction_cache = DiskCache("extracted_text", max_bytes=512 * 1024 * 1024)
+
+# Page-level extraction settings
+PAGES_PER_TASK = 8
+MAX_PAGES = 1000
+PAGE_TIMEOUT = 30  # seconds
+
+# pdfminer ends every page with a form feed, page mode keeps the same layout
+PAGE_BREAK = "\f"
+
+_worker_pdf = None
+
+
+def read_file_bytes(file) -> bytes:
+    return file.getvalue() if hasattr(file, "getvalue") else file.read()
+
+
+def extract_text_from_bytes(data: bytes, file_type: str) -> str:
+    if file_type == "application/pdf":
+        return extract_text(BytesIO(data))
+    elif file_type == "text/plain":
+        return data.decode("utf-8")
     else:
         return "❌ Unsupported file type"
+
+
+def count_pdf_pages(data: bytes) -> int:
+    return sum(1 for _ in PDFPage.get_pages(BytesIO(data)))
+
+
+def _init_worker(data):
+    # Ship the PDF bytes once per worker instead of once per task
+    global _worker_pdf
+    _worker_pdf = data
+
+
+def _extract_page_range(first, last, data=None):
+    text = extract_text(BytesIO(data if data is not None else _worker_pdf), page_numbers=range(first, last))
+    pages = text.split(PAGE_BREAK)[:last - first]
+    return pages + [""] * (last - first - len(pages))
+
+
+def iter_pdf_pages(data: bytes, max_pages=MAX_PAGES, page_timeout=PAGE_TIMEOUT, workers=None, page_count=None):
+    """Yield (page_number, total_pages, text) in page order as pages are extracted.
+
+    Page ranges are spread over a process pool. Pages whose range does not
+    finish within page_timeout seconds per page are yielded with text None.
+    """
+    total = min(page_count if page_count is not None else count_pdf_pages(data), max_pages)
+    if total <= PAGES_PER_TASK:
+        for i, page in enumerate(_extract_page_range(0, total, data)):
+            yield i, total, page
+        return
+
+    ranges = [(first, min(first + PAGES_PER_TASK, total)) for first in range(0, total, PAGES_PER_TASK)]
+    # Imported here so spawned page workers don't pay for the registry's imports
+    from modules.model_registry import available_cpus
+    workers = min(workers or available_cpus(), len(ranges))
+    # Forking Streamlit's multithreaded server can deadlock, so workers are spawned
+    pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(data,))
+    try:
+        results = [pool.apply_async(_extract_page_range, (first, last)) for first, last in ranges]
+        for (first, last), result in zip(ranges, results):
+            try:
+                pages = result.get(timeout=page_timeout * (last - first))
+            except multiprocessing.TimeoutError:
+                logger.warning("PDF pages %d-%d timed out after %ss per page", first + 1, last, page_timeout)
+                pages = [None] * (last - first)
+            for offset, page in enumerate(pages):
+                yield first + offset, total, page
+    finally:
+        # Kills workers still stuck on a timed-out range instead of leaving them running
+        pool.terminate()
+
+
+def extract_pages_from_file(file, max_pages=MAX_PAGES, page_timeout=PAGE_TIMEOUT, status=None):
+    """Stream (page_number, total_pages, text) for an uploaded file.
+
+    Plain text is a single page. Fully extracted PDFs are cached like
+    extract_text_from_file, so a repeat upload streams from the cache.
+    Timed-out pages are yielded with text None. If a status dict is given,
+    it receives "page_count" (pages in the file, which may exceed max_pages)
+    and "timed_out" (numbers of pages that timed out).
+    """
+    status = status if status is not None else {}
+    status["timed_out"] = []
+    data = read_file_bytes(file)
+    if file.type != "application/pdf":
+        status["page_count"] = 1
+        yield 0, 1, extract_text_from_bytes(data, file.type)
+        return
+
+    key = content_hash(data)
+    text = extraction_cache.get(key)
+    if text is not None:
+        pages = text.split(PAGE_BREAK)[:-1] or [text]
+        status["page_count"] = len(pages)
+        for i, page in enumerate(pages):
+            yield i, len(pages), page
+        return
+
+    page_count = count_pdf_pages(data)
+    status["page_count"] = page_count
+    pages = []
+    for i, total, page in iter_pdf_pages(data, max_pages, page_timeout, page_count=page_count):
+        if page is None:
+            status["timed_out"].append(i)
+        pages.append(page or "")
+        yield i, total, page
+    # Only whole documents go in the cache
+    if not status["timed_out"] and len(pages) == page_count:
+        extraction_cache.set(key, "".join(page + PAGE_BREAK for page in pages))
+
+
+@traced("extract_text_from_file")
+def extract_text_from_file(file):
+    data = read_file_bytes(file)
+    if file.type != "application/pdf":
+        return extract_text_from_bytes(data, file.type)
+
+    # A repeat upload of the same PDF skips pdfminer entirely
+    key = content_hash(data)
+    text = extraction_cache.get(key)
+    if text is None:
+        text = extract_text_from_bytes(data, file.type)
+        extraction_cache.set(key, text)
+    return text
+
+
+def read_question_list(file):
+    """Read questions from an uploaded TXT (one per line) or CSV file.
+
+    For CSV the "question" column is used when present, otherwise the first column.
+    """
+    data = read_file_bytes(file).decode("utf-8-sig")
+    if file.name.lower().endswith(".csv"):
+        rows = list(csv.reader(StringIO(data)))
+        if not rows:
+            return []
+        header = [cell.strip().lower() for cell in rows[0]]
+        if "question" in header:
+            column, rows = header.index("question"), rows[1:]
+        else:
+            column = 0
+        lines = [row[column] for row in rows if len(row) > column]
+    else:
+        lines = data.splitlines()
+    return [line.strip() for line in lines if line.strip()]
@@ -0,0 +1,130 @@
+"""Background jobs for the slow model calls, so script reruns never block on them.
+
+Jobs are keyed by (kind, document hash): asking for the same job again
+returns the running one instead of starting a second. Each session that
+asks for a job becomes one of its owners; when a session moves on to
+another document it releases its jobs, and a job nobody owns any more is
+cancelled at its next progress report. Cancellation is cooperative: a job
+stops only where its function reports progress. Summaries report every
+batch of chunks and local question generation every generated token, but
+a cloud request or a call through the model server runs to completion.
+
+Finished jobs are dropped once every owner has collected the result, or
+JOB_TTL seconds after finishing, so closed sessions don't leak them.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+# Model calls already use several cores each, so a small pool is enough
+JOB_WORKERS = int(os.getenv("SMART_ASSISTANT_JOB_WORKERS", "2"))
+# Seconds a finished job's result is kept for owners that haven't collected it
+JOB_TTL = 600
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once the job is cancelled"""
+
+
+class Job:
+    def __init__(self, kind, doc_hash):
+        self.kind = kind
+        self.doc_hash = doc_hash
+        self.owners = set()
+        self.done = 0
+        self.total = 0
+        self.started = time.time()
+        self.finished_at = None
+        self.future = None
+        self._cancelled = threading.Event()
+
+    def report_progress(self, done, total):
+        """Progress callback handed to the job function"""
+        if self._cancelled.is_set():
+            raise JobCancelled(f"{self.kind} job cancelled")
+        self.done, self.total = done, total
+
+    def cancel(self):
+        self._cancelled.set()
+        self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+    def finished(self) -> bool:
+        return self.future.done()
+
+    def result(self):
+        """Result of a finished job; re-raises the job's exception"""
+        return self.future.result()
+
+
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, doc_hash, owner, fn, *args, retry=False, **kwargs) -> Job:
+        """Start fn(*args, progress_callback=..., **kwargs) unless the same job is already known.
+
+        A job that failed is returned as is, so its owners see the error;
+        it is only started again with retry=True, e.g. when the user asks.
+        """
+        key = (kind, doc_hash)
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            if job is None or job.cancelled or (retry and job.finished() and job.future.exception() is not None):
+                job = Job(kind, doc_hash)
+                job.future = self._executor.submit(fn, *args, progress_callback=job.report_progress, **kwargs)
+                job.future.add_done_callback(lambda _, job=job: setattr(job, "finished_at", time.time()))
+                self._jobs[key] = job
+            job.owners.add(owner)
+            return job
+
+    def get(self, kind, doc_hash):
+        with self._lock:
+            self._prune()
+            return self._jobs.get((kind, doc_hash))
+
+    def collect(self, job: Job, owner):
+        """Result of a finished job for one owner; the job is dropped once no owner is left"""
+        with self._lock:
+            job.owners.discard(owner)
+            if not job.owners and self._jobs.get((job.kind, job.doc_hash)) is job:
+                del self._jobs[(job.kind, job.doc_hash)]
+        return job.result()
+
+    def _prune(self):
+        # Caller holds the lock
+        now = time.time()
+        for key, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > JOB_TTL:
+                del self._jobs[key]
+
+    def release(self, owner, keep_doc_hash=None):
+        """Drop owner from its jobs on other documents, cancelling jobs left without owners"""
+        with self._lock:
+            for key, job in list(self._jobs.items()):
+                if job.doc_hash == keep_doc_hash or owner not in job.owners:
+                    continue
+                job.owners.discard(owner)
+                if not job.owners and not job.finished():
+                    job.cancel()
+                if not job.owners:
+                    del self._jobs[key]
+
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Job pool shared by every session of this process"""
+    return JobManager()
@@ -0,0 +1,200 @@
+import functools
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Prometheus text export targets, both optional
+METRICS_FILE = os.getenv("SMART_ASSISTANT_METRICS_FILE")
+METRICS_PORT = os.getenv("SMART_ASSISTANT_METRICS_PORT")
+
+_lock = threading.Lock()
+_stages = {}
+_prompt_tokens = {}  # stage -> prompt tokens sent to a hosted model
+_server = None
+_server_failed = False
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> int:
+    """Resident set size right now; 0 where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _input_size(args, kwargs) -> int:
+    size = 0
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        elif isinstance(value, (list, tuple)):
+            size += sum(len(v) for v in value if isinstance(v, (str, bytes)))
+        elif hasattr(value, "size") and isinstance(value.size, int):
+            size += value.size  # uploaded files
+    return size
+
+
+def record(stage: str, seconds: float, input_size: int = 0, error: bool = False, rss_growth: int = 0):
+    with _lock:
+        stats = _stages.setdefault(stage, {
+            "count": 0, "errors": 0, "seconds_total": 0.0, "seconds_max": 0.0,
+            "last_seconds": 0.0, "input_bytes_total": 0, "last_input_bytes": 0,
+            "last_rss_growth_bytes": 0, "rss_growth_max_bytes": 0,
+        })
+        stats["count"] += 1
+        stats["errors"] += int(error)
+        stats["seconds_total"] += seconds
+        stats["seconds_max"] = max(stats["seconds_max"], seconds)
+        stats["last_seconds"] = seconds
+        stats["input_bytes_total"] += input_size
+        stats["last_input_bytes"] = input_size
+        stats["last_rss_growth_bytes"] = rss_growth
+        stats["rss_growth_max_bytes"] = max(stats["rss_growth_max_bytes"], rss_growth)
+
+
+@contextmanager
+def trace_stage(stage: str, input_size: int = 0):
+    """Record the duration, input size and RSS growth of a block of work.
+
+    RSS growth is the change in current RSS across the block, so memory the
+    stage still holds afterwards (e.g. a model it loaded) is attributed to
+    it. Stages running at the same time on other threads count towards
+    each other's growth.
+    """
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        rss_growth = current_rss_bytes() - rss_before if rss_before else 0
+        record(stage, seconds, input_size, error, rss_growth)
+
+
+def traced(stage: str):
+    """Decorator form of trace_stage; input size is the length of str/bytes arguments"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_stage(stage, _input_size(args, kwargs)):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_prompt_tokens(stage: str, tokens: int):
+    """Count the prompt tokens one call sent to a hosted model"""
+    with _lock:
+        _prompt_tokens[stage] = _prompt_tokens.get(stage, 0) + tokens
+
+
+def prompt_tokens() -> dict:
+    with _lock:
+        return dict(_prompt_tokens)
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {stage: dict(stats) for stage, stats in _stages.items()}
+
+
+def render_prometheus() -> str:
+    """Current metrics in the Prometheus text exposition format"""
+    stages = snapshot()
+    lines = []
+
+    def family(name, kind, help_text, key):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for stage, stats in sorted(stages.items()):
+            lines.append(f'{name}{{stage="{stage}"}} {stats[key]}')
+
+    lines.append("# HELP smart_assistant_stage_duration_seconds Time spent in a pipeline stage")
+    lines.append("# TYPE smart_assistant_stage_duration_seconds summary")
+    for stage, stats in sorted(stages.items()):
+        lines.append(f'smart_assistant_stage_duration_seconds_sum{{stage="{stage}"}} {stats["seconds_total"]}')
+        lines.append(f'smart_assistant_stage_duration_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    family("smart_assistant_stage_duration_seconds_max", "gauge", "Slowest call of a stage", "seconds_max")
+    family("smart_assistant_stage_errors_total", "counter", "Calls of a stage that raised", "errors")
+    family("smart_assistant_stage_input_bytes_total", "counter", "Input characters/bytes processed by a stage", "input_bytes_total")
+    family("smart_assistant_stage_rss_growth_bytes_max", "gauge",
+           "Largest growth in current RSS across one call of a stage", "rss_growth_max_bytes")
+    lines.append("# HELP smart_assistant_prompt_tokens_total Prompt tokens sent to hosted models")
+    lines.append("# TYPE smart_assistant_prompt_tokens_total counter")
+    for stage, tokens in sorted(prompt_tokens().items()):
+        lines.append(f'smart_assistant_prompt_tokens_total{{stage="{stage}"}} {tokens}')
+    lines.append("# HELP smart_assistant_peak_rss_bytes Process peak resident set size")
+    lines.append("# TYPE smart_assistant_peak_rss_bytes gauge")
+    lines.append(f"smart_assistant_peak_rss_bytes {peak_rss_bytes()}")
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path: str = None):
+    """Write the metrics to a file (e.g. for node_exporter's textfile collector)"""
+    path = path or METRICS_FILE
+    if not path:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".prom.tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = None):
+    """Serve /metrics over HTTP from a daemon thread, once per process.
+
+    If the port is taken (e.g. by another replica on the same host) the
+    error is logged once and the app runs without the endpoint.
+    """
+    global _server, _server_failed
+    port = port or (int(METRICS_PORT) if METRICS_PORT else None)
+    with _lock:
+        if _server is not None or _server_failed or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        except OSError as e:
+            _server_failed = True
+            logger.error("Metrics server disabled, cannot bind 127.0.0.1:%d: %s", port, e)
+            return None
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
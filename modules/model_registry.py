@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+
+import streamlit as st
+
+# Inference backend for the QA reader and sentence encoder: torch, onnx or onnx-int8
+BACKEND = os.getenv("SMART_ASSISTANT_BACKEND", "torch")
+
+# Unix socket of a shared model server (python -m modules.model_server); in-process when unset
+MODEL_SERVER = os.getenv("SMART_ASSISTANT_MODEL_SERVER")
+
+# Intra-op threads for torch; torch's own default when unset
+TORCH_THREADS = os.getenv("SMART_ASSISTANT_TORCH_THREADS")
+
+MODEL_IDS = {
+    "summarizer": "facebook/bart-large-cnn",
+    "qa": "distilbert-base-uncased-distilled-squad",
+    "generator": "gpt2",
+    "encoder": "all-MiniLM-L6-v2",
+}
+
+# Seconds spent loading each model, filled in the first time it is used
+load_times = {}
+# Seconds spent importing the app modules on the first script run
+startup_time = None
+
+# Models installed with set_model take precedence over the loaders (stubs, remote proxies)
+_overrides = {}
+
+_warmup_lock = threading.Lock()
+_warmup_started = False
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity masks (e.g. container cpusets)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def configure_threads(threads: int = None):
+    """Set torch's intra-op thread count, from the argument or SMART_ASSISTANT_TORCH_THREADS"""
+    threads = threads or (int(TORCH_THREADS) if TORCH_THREADS else None)
+    if not threads:
+        return
+    import torch
+    torch.set_num_threads(threads)
+
+
+def _timed(name, loader):
+    start = time.perf_counter()
+    model = loader()
+    load_times[name] = time.perf_counter() - start
+    return model
+
+
+@st.cache_resource
+def load_summarizer():
+    def load():
+        from transformers import pipeline
+        return pipeline("summarization", model=MODEL_IDS["summarizer"])
+    return _timed("summarizer", load)
+
+
+@st.cache_resource
+def load_qa_pipeline():
+    def load():
+        if BACKEND.startswith("onnx"):
+            from modules.onnx_backend import load_onnx_qa_pipeline
+            return load_onnx_qa_pipeline(quantize=BACKEND == "onnx-int8")
+        from transformers import pipeline
+        return pipeline("question-answering", model=MODEL_IDS["qa"])
+    return _timed("qa", load)
+
+
+@st.cache_resource
+def load_generator():
+    def load():
+        from transformers import pipeline
+        return pipeline("text-generation", model=MODEL_IDS["generator"])
+    return _timed("generator", load)
+
+
+@st.cache_resource
+def load_encoder():
+    def load():
+        if BACKEND.startswith("onnx"):
+            from modules.onnx_backend import OnnxSentenceEncoder
+            return OnnxSentenceEncoder(quantize=BACKEND == "onnx-int8")
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(MODEL_IDS["encoder"])
+    return _timed("encoder", load)
+
+
+LOADERS = {
+    "summarizer": load_summarizer,
+    "qa": load_qa_pipeline,
+    "generator": load_generator,
+    "encoder": load_encoder,
+}
+
+
+def get_model(name: str):
+    """Return a shared model, loading it on first use"""
+    if name in _overrides:
+        return _overrides[name]
+    if MODEL_SERVER:
+        return _load_remote_model(name, MODEL_SERVER)
+    return LOADERS[name]()
+
+
+@st.cache_resource
+def _load_remote_model(name: str, socket_path: str):
+    from modules.model_server import RemoteModel
+    return RemoteModel(name, socket_path)
+
+
+def set_model(name: str, model):
+    """Replace a model for this process, e.g. with a lightweight stub"""
+    if name not in LOADERS:
+        raise KeyError(f"Unknown model: {name}")
+    _overrides[name] = model
+
+
+def warm_up(names=None):
+    """Load models in a background thread so the first request doesn't pay for it.
+
+    names defaults to the comma separated SMART_ASSISTANT_WARMUP setting
+    ("all" for every model); nothing is loaded when it is unset.
+    """
+    global _warmup_started
+    if names is None:
+        setting = os.getenv("SMART_ASSISTANT_WARMUP", "").strip()
+        if not setting:
+            return None
+        names = list(LOADERS) if setting == "all" else [n.strip() for n in setting.split(",")]
+
+    with _warmup_lock:
+        if _warmup_started:
+            return None
+        _warmup_started = True
+
+    def run():
+        for name in names:
+            if name in LOADERS:
+                get_model(name)
+
+    thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def record_startup_time(seconds: float):
+    global startup_time
+    if startup_time is None:
+        startup_time = seconds
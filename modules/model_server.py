@@ -0,0 +1,200 @@
+"""Local model server shared by several app processes over a Unix socket.
+
+    python -m modules.model_server --socket /tmp/smart_assistant.sock --preload all
+
+Start the app processes with SMART_ASSISTANT_MODEL_SERVER pointing at the
+same socket and model_registry.get_model hands out RemoteModel proxies
+instead of loading the weights in every process.
+
+Messages are length-prefixed JSON: a request names the model, the method
+and its arguments; NumPy arrays travel as base64-encoded buffers.
+"""
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+from modules import model_registry
+
+# Methods a client may call on each model
+ALLOWED_METHODS = {
+    "summarizer": {"__call__"},
+    "qa": {"__call__"},
+    "generator": {"__call__"},
+    "encoder": {"encode", "get_sentence_embedding_dimension"},
+}
+
+_HEADER = struct.Struct("!I")
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return {"__ndarray__": base64.b64encode(np.ascontiguousarray(value).tobytes()).decode("ascii"),
+                "dtype": str(value.dtype), "shape": list(value.shape)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "detach"):  # torch tensors
+        return _to_json(value.detach().cpu().numpy())
+    raise TypeError(f"Cannot send {type(value).__name__} to the model server")
+
+
+def _from_json(value):
+    if isinstance(value, dict):
+        if "__ndarray__" in value:
+            data = base64.b64decode(value["__ndarray__"])
+            return np.frombuffer(data, dtype=value["dtype"]).reshape(value["shape"])
+        return {k: _from_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_json(v) for v in value]
+    return value
+
+
+def send_message(sock, message):
+    payload = json.dumps(message, default=_to_json).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_message(sock):
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        raise ConnectionError("Model server connection closed mid-message")
+    return _from_json(json.loads(payload))
+
+
+def _recv_exact(sock, n):
+    chunks = bytearray()
+    while len(chunks) < n:
+        chunk = sock.recv(n - len(chunks))
+        if not chunk:
+            return None
+        chunks += chunk
+    return bytes(chunks)
+
+
+class ModelRequestHandler(socketserver.BaseRequestHandler):
+    """Serves requests on one client connection until it closes"""
+
+    def handle(self):
+        while True:
+            try:
+                request = recv_message(self.request)
+            except ConnectionError:
+                return
+            if request is None:
+                return
+            try:
+                response = {"ok": True, "result": self.server.dispatch(request)}
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            send_message(self.request, response)
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        self.model_locks = {name: threading.Lock() for name in ALLOWED_METHODS}
+        super().__init__(socket_path, ModelRequestHandler)
+
+    def dispatch(self, request):
+        name, method = request["model"], request["method"]
+        if method not in ALLOWED_METHODS.get(name, ()):
+            raise ValueError(f"{name}.{method} is not served")
+        model = model_registry.get_model(name)
+        target = model if method == "__call__" else getattr(model, method)
+        # One forward pass per model at a time; different models run in parallel
+        with self.model_locks[name]:
+            return target(*request.get("args", []), **request.get("kwargs", {}))
+
+
+class RemoteModel:
+    """Client-side stand-in for a pipeline or SentenceTransformer hosted by the server"""
+
+    def __init__(self, name, socket_path):
+        self.name = name
+        self.socket_path = socket_path
+        self._local = threading.local()
+        self._tokenizer = None
+
+    def _socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _request(self, method, args, kwargs):
+        message = {"model": self.name, "method": method, "args": list(args), "kwargs": kwargs}
+        for attempt in range(2):
+            try:
+                sock = self._socket()
+                send_message(sock, message)
+                response = recv_message(sock)
+                if response is None:
+                    raise ConnectionError("Model server closed the connection")
+                break
+            except (ConnectionError, OSError):
+                # Reconnect once, e.g. after a server restart
+                self._local.sock = None
+                if attempt:
+                    raise
+        if not response["ok"]:
+            raise RuntimeError(f"Model server error: {response['error']}")
+        return response["result"]
+
+    def __call__(self, *args, **kwargs):
+        return self._request("__call__", args, kwargs)
+
+    def encode(self, sentences, **kwargs):
+        kwargs.pop("convert_to_tensor", None)
+        kwargs["convert_to_numpy"] = True
+        return self._request("encode", [sentences], kwargs)
+
+    def get_sentence_embedding_dimension(self):
+        return self._request("get_sentence_embedding_dimension", [], {})
+
+    @property
+    def tokenizer(self):
+        # Tokenizers are small, so token counting stays local
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(model_registry.MODEL_IDS[self.name])
+        return self._tokenizer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default="/tmp/smart_assistant.sock", help="Unix socket path to listen on")
+    parser.add_argument("--preload", default="", help="models to load at startup: all or e.g. qa,encoder")
+    args = parser.parse_args(argv)
+
+    # The server itself always hosts the models in-process
+    model_registry.MODEL_SERVER = None
+    names = list(ALLOWED_METHODS) if args.preload == "all" else [n for n in args.preload.split(",") if n]
+    for name in names:
+        model_registry.get_model(name)
+        print(f"Loaded {name} in {model_registry.load_times.get(name, 0):.1f}s", flush=True)
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    with ModelServer(args.socket) as server:
+        print(f"Serving models on {args.socket}", flush=True)
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
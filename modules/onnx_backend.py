@@ -0,0 +1,96 @@
+"""ONNX Runtime backend for the QA reader and the MiniLM sentence encoder.
+
+Models are exported once with Hugging Face Optimum into the cache directory,
+optionally with dynamic int8 quantization, and then served by ONNX Runtime
+behind the same interfaces as the PyTorch models. Needs the optional
+`optimum[onnxruntime]` package.
+"""
+import os
+
+import numpy as np
+
+from modules.cache import cache_dir
+
+QA_MODEL_ID = "distilbert-base-uncased-distilled-squad"
+ENCODER_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+# Matches SentenceTransformer('all-MiniLM-L6-v2').max_seq_length
+ENCODER_MAX_LENGTH = 256
+
+QUANTIZED_FILE = "model_quantized.onnx"
+
+
+def _require_optimum():
+    try:
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "The ONNX backend needs Optimum and ONNX Runtime: pip install 'optimum[onnxruntime]'"
+        ) from e
+
+
+def export_model(model_class, model_id: str, quantize: bool = False):
+    """Export a model to ONNX (and int8) once, then load it from the cache directory"""
+    _require_optimum()
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    export_dir = os.path.join(cache_dir("onnx"), model_id.replace("/", "--"))
+    if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+        model_class.from_pretrained(model_id, export=True).save_pretrained(export_dir)
+
+    if not quantize:
+        return model_class.from_pretrained(export_dir)
+
+    if not os.path.exists(os.path.join(export_dir, QUANTIZED_FILE)):
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=export_dir, quantization_config=config)
+    return model_class.from_pretrained(export_dir, file_name=QUANTIZED_FILE)
+
+
+def load_onnx_qa_pipeline(quantize: bool = False):
+    """A transformers question-answering pipeline running on ONNX Runtime"""
+    _require_optimum()
+    from optimum.onnxruntime import ORTModelForQuestionAnswering
+    from transformers import AutoTokenizer, pipeline
+
+    model = export_model(ORTModelForQuestionAnswering, QA_MODEL_ID, quantize)
+    tokenizer = AutoTokenizer.from_pretrained(QA_MODEL_ID)
+    return pipeline("question-answering", model=model, tokenizer=tokenizer)
+
+
+class OnnxSentenceEncoder:
+    """Drop-in for the SentenceTransformer.encode calls the modules make"""
+
+    def __init__(self, quantize: bool = False):
+        _require_optimum()
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        self.model = export_model(ORTModelForFeatureExtraction, ENCODER_MODEL_ID, quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(ENCODER_MODEL_ID)
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.config.hidden_size
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        batches = []
+        for i in range(0, len(sentences), batch_size):
+            inputs = self.tokenizer(
+                sentences[i:i + batch_size], padding=True, truncation=True,
+                max_length=ENCODER_MAX_LENGTH, return_tensors="np",
+            )
+            hidden = self.model(**inputs).last_hidden_state
+            hidden = hidden.numpy() if hasattr(hidden, "numpy") else np.asarray(hidden)
+            # Mean pooling over real tokens, as in the sentence-transformers model
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            batches.append((hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        embeddings = np.concatenate(batches).astype(np.float32) if batches else \
+            np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+        return embeddings[0] if single else embeddings
@@ -0,0 +1,200 @@
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import httpx
+import streamlit as st
+from openai import OpenAI
+
+from modules.cache import DiskCache, LRUCache, content_hash
+from modules import metrics
+from modules.context_builder import build_context, count_tokens
+from modules.metrics import traced
+from modules.semantic_cache import cached_answer
+
+MODEL = "deepseek/deepseek-r1-0528:free"
+
+# Per-request timeout and fan-out width, in seconds / concurrent requests
+REQUEST_TIMEOUT = float(os.getenv("OPENROUTER_TIMEOUT", "60"))
+MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "4"))
+
+# Response cache: in-memory entries, plus an optional disk tier enabled by a TTL in seconds
+RESPONSE_CACHE_SIZE = int(os.getenv("OPENROUTER_CACHE_SIZE", "512"))
+DISK_CACHE_TTL = os.getenv("OPENROUTER_DISK_CACHE_TTL")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+class OpenRouterAPI:
+    """Handle OpenRouter API interactions"""
+
+    def __init__(self, api_key, timeout=REQUEST_TIMEOUT, max_concurrency=MAX_CONCURRENCY):
+        if not api_key:
+            raise ValueError("An OpenRouter API key is required; set the API_KEY environment variable")
+        self.api_key = api_key
+        self.timeout = timeout
+        # One pooled HTTP client, so keep-alive connections are reused between calls
+        self.http_client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency * 2, max_keepalive_connections=max_concurrency),
+        )
+        self.client = OpenAI(
+            base_url="https://openrouter.ai/api/v2",
+            api_key=api_key,
+            http_client=self.http_client,
+            timeout=timeout,
+        )
+        self.headers = {
+            "HTTP-Referer": "https://genai-assistant.streamlit.app/",
+            "X-Title": "SmartResearchAssistant"
+        }
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="openrouter")
+
+        self.response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+        self.disk_cache_ttl = float(DISK_CACHE_TTL) if DISK_CACHE_TTL else None
+        self.disk_cache = DiskCache("openrouter_responses") if self.disk_cache_ttl else None
+        self._stats_lock = threading.Lock()
+        self.disk_hits = 0
+        self.api_calls = 0
+        self.api_seconds = 0.0
+        self.prompt_tokens = 0
+
+    def _complete(self, prompt, stage="openrouter"):
+        key = content_hash(f"{MODEL}\0{normalize_prompt(prompt)}")
+        content = self.response_cache.get(key)
+        if content is not None:
+            return content
+
+        if self.disk_cache is not None:
+            content = self.disk_cache.get(key, ttl=self.disk_cache_ttl)
+            if content is not None:
+                with self._stats_lock:
+                    self.disk_hits += 1
+                self.response_cache.set(key, content)
+                return content
+
+        tokens = count_tokens(prompt)
+        start = time.perf_counter()
+        completion = self.client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            extra_headers=self.headers
+        )
+        content = completion.choices[0].message.content
+        seconds = time.perf_counter() - start
+        with self._stats_lock:
+            self.api_calls += 1
+            self.api_seconds += seconds
+            self.prompt_tokens += tokens
+        metrics.record_prompt_tokens(stage, tokens)
+        logger.info("%s: sent %d prompt tokens in %.2f s", stage, tokens, seconds)
+
+        self.response_cache.set(key, content)
+        if self.disk_cache is not None:
+            self.disk_cache.set(key, content)
+        return content
+
+    def cache_stats(self):
+        """Hit/miss counters and the round-trip time the cache has saved"""
+        hits = self.response_cache.hits + self.disk_hits
+        avg_call = self.api_seconds / self.api_calls if self.api_calls else 0.0
+        return {
+            "memory_hits": self.response_cache.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.api_calls,
+            "hit_rate": hits / (hits + self.api_calls) if hits + self.api_calls else 0.0,
+            "seconds_saved": hits * avg_call,
+            "prompt_tokens": self.prompt_tokens,
+        }
+
+    @traced("openrouter.answer_question")
+    def answer_question(self, question, context):
+        """Get answer from OpenRouter API"""
+        def complete():
+            prompt = f"""You are a research assistant. Answer based only on the document below:
+
+DOCUMENT:
+\"\"\"
+{build_context(context, question)}
+\"\"\"
+
+Q: {question}
+A:"""
+            return {
+                "answer": self._complete(prompt, "openrouter.answer_question"),
+                "score": 1.0
+            }
+
+        # Rephrasings of an earlier question reuse its answer without an API call
+        return cached_answer(f"openrouter:{MODEL}", question, context, complete)
+
+    @traced("openrouter.generate_questions")
+    def generate_questions(self, context):
+        """Generate questions from document"""
+        prompt = f"""Generate 3 logic-based or comprehension questions from this document:
+
+\"\"\"
+{build_context(context)}
+\"\"\"
+
+Return the questions numbered as 1., 2., 3."""
+
+        raw = self._complete(prompt, "openrouter.generate_questions").strip()
+        questions = [line.split('.', 1)[1].strip() for line in raw.splitlines() if '.' in line]
+        return questions
+
+    @traced("openrouter.evaluate_answer")
+    def evaluate_answer(self, user_answer, context, question):
+        """Evaluate user's answer"""
+        prompt = f"""Evaluate the user's answer based only on this document:
+
+\"\"\"
+{build_context(context, f"{question} {user_answer}")}
+\"\"\"
+
+Question: {question}
+Answer: {user_answer}
+
+Give a short evaluation like 'Correct', 'Partially correct', or 'Incorrect' with a one-line justification."""
+
+        return self._complete(prompt, "openrouter.evaluate_answer").strip()
+
+    def run_concurrently(self, calls, timeout=None):
+        """Run independent (method, args) calls in parallel and return results in order.
+
+        Each result is either the return value or the exception raised. Calls
+        still pending when the overall timeout expires are cancelled and
+        reported as TimeoutError.
+        """
+        futures = [self.executor.submit(method, *args) for method, args in calls]
+        done, not_done = wait(futures, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+
+        results = []
+        for future in futures:
+            if future in not_done:
+                results.append(TimeoutError("OpenRouter request timed out"))
+            elif future.exception() is not None:
+                results.append(future.exception())
+            else:
+                results.append(future.result())
+        return results
+
+    @traced("openrouter.evaluate_answers")
+    def evaluate_answers(self, items, timeout=None):
+        """Evaluate several (user_answer, context, question) triples concurrently"""
+        return self.run_concurrently([(self.evaluate_answer, item) for item in items], timeout=timeout)
+
+
+@st.cache_resource
+def get_api_client(api_key):
+    """Long-lived client shared across sessions and reruns"""
+    return OpenRouterAPI(api_key)
@@ -0,0 +1,121 @@
+import re
+
+import numpy as np
+import streamlit as st
+
+from modules.cache import content_hash
+from modules.file_handler import PAGE_BREAK
+from modules.retriever import PASSAGE_STRIDE, PASSAGE_WORDS, get_passage_index, tokenize
+
+# Longest page the raw-text viewer sends to the browser at once
+PAGE_CHARS = 4000
+MAX_SEARCH_HITS = 50
+# Search stops narrowing by postings once this few passages are left
+MIN_CANDIDATES = 64
+
+
+class PageIndex:
+    """Page boundaries of one document so the viewer only sends the visible page"""
+
+    def __init__(self, text: str, page_chars=PAGE_CHARS, passages=None):
+        self.text = text
+        # BM25 passage index of the same text, used to narrow searches
+        self.passages = passages
+        starts = []
+        position = 0
+        # PDF pages end with a page break; TXT files and long pages are split
+        # into windows that end on whitespace
+        for page in text.split(PAGE_BREAK):
+            page_end = position + len(page)
+            while True:
+                starts.append(position)
+                if page_end - position <= page_chars:
+                    break
+                cut = text.rfind(" ", position + page_chars // 2, position + page_chars)
+                position = cut + 1 if cut != -1 else position + page_chars
+            position = page_end + len(PAGE_BREAK)
+        if len(starts) > 1 and starts[-1] >= len(text):
+            starts.pop()  # trailing page break
+        self.starts = np.array(starts, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def bounds(self, page: int):
+        """[start, end) character offsets of a page, without its page break"""
+        start = int(self.starts[page])
+        end = int(self.starts[page + 1]) if page + 1 < len(self) else len(self.text)
+        if self.text.endswith(PAGE_BREAK, start, end):
+            end -= len(PAGE_BREAK)
+        return start, end
+
+    def page(self, page: int) -> str:
+        start, end = self.bounds(page)
+        return self.text[start:end]
+
+    def page_at(self, offset: int) -> int:
+        """Page containing a character offset, e.g. the start of a QA answer"""
+        return max(int(np.searchsorted(self.starts, offset, side="right")) - 1, 0)
+
+    def _candidate_spans(self, needle: str):
+        """Merged [start, end) spans of the passages that can contain needle,
+        or None when the whole text should be scanned"""
+        terms = tokenize(needle)
+        # Passages overlap by PASSAGE_WORDS - PASSAGE_STRIDE words, so a match
+        # no longer than that lies inside at least one passage
+        if self.passages is None or not terms or len(needle.split()) > PASSAGE_WORDS - PASSAGE_STRIDE:
+            return None
+        postings = self.passages.postings
+        sized = []
+        for i, term in enumerate(terms):
+            # Inner terms are whole words; the outer ones may be parts of words
+            words = [term] if 0 < i < len(terms) - 1 else [word for word in postings if term in word]
+            sized.append((sum(len(postings.get(word, ())) for word in words), words))
+        sized.sort(key=lambda item: item[0])
+        # A single frequent term reaches the hit limit quickly in a plain scan
+        if len(sized) == 1 and sized[0][0] > len(self.passages) // 8:
+            return None
+        candidates = None
+        for _, words in sized:
+            ids = {passage_id for word in words for passage_id, _ in postings.get(word, ())}
+            candidates = ids if candidates is None else candidates & ids
+            # Scanning a few passages is cheaper than intersecting more postings
+            if len(candidates) <= MIN_CANDIDATES:
+                break
+        spans = []
+        for passage_id in sorted(candidates):
+            start, end = self.passages.spans[passage_id]
+            if spans and start <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end])
+        return spans
+
+    def search(self, query: str, limit=MAX_SEARCH_HITS):
+        """Case-insensitive matches as (page, start, end), in document order.
+
+        Only the passages whose postings hold the query's words are scanned,
+        so a search doesn't read the whole document.
+        """
+        needle = query.strip()
+        hits = []
+        if not needle:
+            return hits
+        pattern = re.compile(re.escape(needle), re.IGNORECASE)
+        spans = self._candidate_spans(needle)
+        for start, end in spans if spans is not None else [(0, len(self.text))]:
+            for match in pattern.finditer(self.text, start, end):
+                hits.append((self.page_at(match.start()), match.start(), match.end()))
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+
+@st.cache_resource(max_entries=16)
+def _load_page_index(doc_hash: str, _text: str) -> PageIndex:
+    return PageIndex(_text, passages=get_passage_index(_text))
+
+
+def get_page_index(text: str) -> PageIndex:
+    """Build (once per document content) and return the page index"""
+    return _load_page_index(content_hash(text), text)
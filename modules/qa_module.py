@@ -1,20 +1,116 @@
-import streamlit as st
-from transformers import pipeline
-
-@st.cache_resource
-def load_qa_pipeline():
-    return pipeline("question-answering", model="distilbert-base-uncased-distilled-squad")
-
-qa_pipeline = load_qa_pipeline()
-
-def answer_question(question: str, context: str) -> dict:
-    if not question.strip():
-        return {"answer": "❌ Question was empty", "score": 0, "start": 0, "end": 0}
-
-    response = qa_pipeline(question=question, context=context)
-    return {
-        "answer": response["answer"],
-        "score": response["score"],
-        "start": response["start"],
-        "end": response["end"]
-    }
+from modules.metrics import traced
+from modules.model_registry import get_model
+from modules.retriever import get_passage_index
+from modules.semantic_cache import cached_answer
+
+# Number of retrieved passages the reader model runs on
+TOP_K = 3
+# Reader inputs per forward pass in batch mode
+BATCH_SIZE = 16
+
+@traced("answer_question")
+def answer_question(question: str, context: str, top_k: int = TOP_K) -> dict:
+    def read():
+        result = _answer_questions([question], context, top_k, BATCH_SIZE)[0]
+        del result["question"]
+        return result
+
+    # Rephrasings of an earlier question reuse its answer
+    return cached_answer(f"local:{top_k}", question, context, read)
+
+@traced("answer_questions")
+def answer_questions(questions, context: str, top_k: int = TOP_K, batch_size: int = BATCH_SIZE) -> list:
+    """Answer a list of questions against one document in batched reader passes.
+
+    Returns one dict per question with question, answer, score and the
+    start/end character offsets of the answer in the document.
+    """
+    return _answer_questions(questions, context, top_k, batch_size)
+
+def _answer_questions(questions, context, top_k, batch_size):
+    index = get_passage_index(context)
+    results = []
+    inputs, owners, passage_starts = [], [], []
+    for i, question in enumerate(questions):
+        if not question.strip():
+            results.append({"question": question, "answer": "❌ Question was empty", "score": 0, "start": 0, "end": 0})
+            continue
+        if not len(index):
+            results.append({"question": question, "answer": "❌ Document is empty", "score": 0, "start": 0, "end": 0})
+            continue
+        results.append(None)
+        # Retrieve the most relevant passages and only read those
+        hits = index.search(question, top_k) or [(0, 0.0)]
+        for pid, _ in hits:
+            inputs.append({"question": question, "context": index.passage_text(pid)})
+            owners.append(i)
+            passage_starts.append(index.spans[pid][0])
+
+    if inputs:
+        responses = get_model("qa")(inputs, batch_size=batch_size)
+        if isinstance(responses, dict):
+            responses = [responses]
+        for owner, passage_start, response in zip(owners, passage_starts, responses):
+            best = results[owner]
+            if best is None or response["score"] > best["score"]:
+                # Map the span back from passage to document offsets
+                results[owner] = {
+                    "question": questions[owner],
+                    "answer": response["answer"],
+                    "score": response["score"],
+                    "start": passage_start + response["start"],
+                    "end": passage_start + response["end"]
+                }
+    return results
+
+
+# Long-context mode: scan windows best-prior-first and stop once confident
+CONFIDENCE = 0.5
+WINDOW_BATCH = 8
+
+@traced("answer_question_long")
+def answer_question_long(question: str, context: str, confidence: float = CONFIDENCE,
+                         top_k: int = 1, window_batch: int = WINDOW_BATCH) -> dict:
+    """Answer from the whole document, reading windows in order of a BM25 prior.
+
+    Windows are read window_batch at a time and the scan stops as soon as an
+    answer scores at least `confidence`. Returns the best answer, up to top_k
+    candidates with document offsets, and how many windows were read.
+    """
+    index = get_passage_index(context)
+    if not question.strip() or not len(index):
+        answer = "❌ Question was empty" if not question.strip() else "❌ Document is empty"
+        return {"answer": answer, "score": 0, "start": 0, "end": 0, "candidates": [],
+                "windows_evaluated": 0, "windows_total": len(index)}
+
+    # Cheap relevance prior; windows sharing no terms follow in document order
+    prior = index.scores(question)
+    order = sorted(range(len(index)), key=lambda pid: (-prior.get(pid, 0.0), pid))
+
+    qa = get_model("qa")
+    candidates = {}
+    evaluated = 0
+    for i in range(0, len(order), window_batch):
+        batch = order[i:i + window_batch]
+        inputs = [{"question": question, "context": index.passage_text(pid)} for pid in batch]
+        responses = qa(inputs, batch_size=window_batch, top_k=top_k)
+        # A single input comes back unwrapped: one dict, or a flat list of its top_k answers
+        if len(batch) == 1:
+            responses = [responses]
+        evaluated += len(batch)
+
+        for pid, response in zip(batch, responses):
+            passage_start = index.spans[pid][0]
+            for answer in (response if isinstance(response, list) else [response]):
+                span = (passage_start + answer["start"], passage_start + answer["end"])
+                # Overlapping windows can find the same span twice
+                if span not in candidates or answer["score"] > candidates[span]["score"]:
+                    candidates[span] = {"answer": answer["answer"], "score": answer["score"],
+                                        "start": span[0], "end": span[1]}
+
+        if candidates and max(c["score"] for c in candidates.values()) >= confidence:
+            break
+
+    ranked = sorted(candidates.values(), key=lambda c: c["score"], reverse=True)[:top_k]
+    best = ranked[0] if ranked else {"answer": "", "score": 0, "start": 0, "end": 0}
+    return {**best, "candidates": ranked, "windows_evaluated": evaluated, "windows_total": len(index)}
@@ -1,24 +1,106 @@
-from transformers import pipeline
+import re
 
-# Load text generation model
-generator = pipeline("text-generation", model="gpt2")
+from modules.cache import DiskCache, content_hash
+from modules.metrics import traced
+from modules.model_registry import get_model
 
-def generate_questions(text, count=3):
+# Candidate question sets sampled in one batched generate call
+CANDIDATE_SETS = 4
+MAX_NEW_TOKENS = 200
+# Well-formed questions: a numbered line ending in "?" with a few words
+_QUESTION_RE = re.compile(r"^\s*\d+\s*[.)]\s*(.{10,}?\?)", re.M)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Generated question sets per document, so repeated clicks are instant
+question_cache = DiskCache("questions", max_bytes=16 * 1024 * 1024)
+
+
+def parse_questions(generated: str) -> list:
+    return [q.strip() for q in _QUESTION_RE.findall(generated)]
+
+
+def _stopping_criteria(tokenizer, prompt_length, count, progress_callback=None):
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class QuestionCountCriteria(StoppingCriteria):
+        """Stop each sequence once it holds `count` well-formed questions"""
+
+        def __call__(self, input_ids, scores, **kwargs):
+            if progress_callback:
+                # Lets a background job cancel generation between tokens
+                progress_callback(0, 1)
+            texts = tokenizer.batch_decode(input_ids[:, prompt_length:], skip_special_tokens=True)
+            done = [len(parse_questions("1." + text)) >= count for text in texts]
+            return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    return StoppingCriteriaList([QuestionCountCriteria()])
+
+
+def _rank_questions(candidates, text, count):
+    """Deduplicate candidate questions and keep the best grounded ones"""
+    doc_words = set(_WORD_RE.findall(text.lower()))
+    seen, ranked = [], []
+    for question in candidates:
+        words = set(_WORD_RE.findall(question.lower()))
+        if not words or any(len(words & other) / len(words | other) > 0.8 for other in seen):
+            continue
+        seen.append(words)
+        # Prefer questions about the document's own vocabulary, of a readable length
+        grounding = len(words & doc_words) / len(words)
+        length_penalty = 0.0 if 5 <= len(words) <= 25 else 0.3
+        ranked.append((grounding - length_penalty, question))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return [question for _, question in ranked[:count]]
+
+
+@traced("generate_questions")
+def generate_questions(text, count=3, progress_callback=None):
     # Truncate long text for GPT-2 context window
     text = text.strip().replace("\n", " ")[:800]
 
+    key = f"{content_hash(text)}:{count}"
+    cached = question_cache.get(key)
+    if cached is not None:
+        return cached
+
     # Prompt strategy
     prompt = f"""Read the following paragraph and generate {count} comprehension questions:\n\n{text}\n\nQuestions:\n1."""
-    
-    output = generator(prompt, max_length=300, num_return_sequences=1, do_sample=True, temperature=0.7)[0]['generated_text']
 
-    # Extract questions
-    raw_lines = output.split("\n")
-    questions = [line.strip() for line in raw_lines if line.strip().startswith(tuple("1234567890"))]
+    if progress_callback:
+        progress_callback(0, 1)
+
+    generator = get_model("generator")
+    kwargs = {}
+    if hasattr(generator, "model"):
+        # In-process pipelines stop as soon as every sequence has enough
+        # questions; custom criteria can't be sent to the model server
+        prompt_length = len(generator.tokenizer(prompt)["input_ids"])
+        kwargs["stopping_criteria"] = _stopping_criteria(generator.tokenizer, prompt_length, count, progress_callback)
+        kwargs["pad_token_id"] = generator.tokenizer.eos_token_id
+
+    outputs = generator(
+        prompt,
+        max_new_tokens=MAX_NEW_TOKENS,
+        num_return_sequences=CANDIDATE_SETS,
+        do_sample=True,
+        temperature=0.7,
+        return_full_text=False,
+        **kwargs
+    )
+    generated = [output["generated_text"] for output in outputs]
+
+    # Extract questions from every candidate set
+    candidates = [q for output in generated for q in parse_questions("1." + output)]
+    questions = _rank_questions(candidates, text, count)
 
     # Fallback if model adds unexpected format
     if not questions:
-        questions = output.split("?")
-        questions = [q.strip() + "?" for q in questions if len(q.strip()) > 10][:count]
+        pieces = " ".join(generated).split("?")
+        questions = [q.strip() + "?" for q in pieces if len(q.strip()) > 10][:count]
 
-    return questions[:count]
+    if len(questions) >= count:
+        question_cache.set(key, questions)
+    if progress_callback:
+        progress_callback(1, 1)
+    return questions
@@ -0,0 +1,184 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+import streamlit as st
+
+from modules.cache import content_hash
+
+# Passages are overlapping word windows so an answer is never cut in half
+PASSAGE_WORDS = 150
+PASSAGE_STRIDE = 120
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def bm25_idf(n_passages: int, document_frequency: int) -> float:
+    return math.log(1 + (n_passages - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+class PassageIndex:
+    """BM25 inverted index over overlapping passages of one document"""
+
+    def __init__(self, text: str, passage_words=PASSAGE_WORDS, stride=PASSAGE_STRIDE):
+        self.text = text
+        self.spans = []
+        self.lengths = []
+        self.postings = defaultdict(list)  # term -> [(passage_id, term_frequency)]
+
+        words = [m.span() for m in re.finditer(r"\S+", text)]
+        for first in range(0, max(len(words), 1), stride):
+            window = words[first:first + passage_words]
+            if not window:
+                break
+            start, end = window[0][0], window[-1][1]
+            passage_id = len(self.spans)
+            terms = Counter(tokenize(text[start:end]))
+            for term, tf in terms.items():
+                self.postings[term].append((passage_id, tf))
+            self.spans.append((start, end))
+            self.lengths.append(sum(terms.values()))
+            if first + passage_words >= len(words):
+                break
+        self._compute_statistics()
+
+    @classmethod
+    def from_parts(cls, text, spans, lengths, postings) -> "PassageIndex":
+        """Rebuild an index from stored passages without re-tokenizing the text"""
+        index = cls.__new__(cls)
+        index.text = text
+        index.spans = [tuple(span) for span in spans]
+        index.lengths = list(lengths)
+        index.postings = defaultdict(list, {term: [tuple(p) for p in posts] for term, posts in postings.items()})
+        index._compute_statistics()
+        return index
+
+    def _compute_statistics(self):
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        n = len(self.spans)
+        self.idf = {term: bm25_idf(n, len(posts)) for term, posts in self.postings.items()}
+
+    def __len__(self):
+        return len(self.spans)
+
+    def passage_text(self, passage_id: int) -> str:
+        start, end = self.spans[passage_id]
+        return self.text[start:end]
+
+    def scores(self, query: str, idf: dict = None, avg_length: float = None) -> dict:
+        """BM25 score for every passage sharing at least one term with the query.
+
+        idf and avg_length default to this document's statistics; a corpus
+        passes collection-wide ones so scores are comparable across shards.
+        """
+        idf_table = self.idf if idf is None else idf
+        avg_length = avg_length or self.avg_length or 1
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = idf_table.get(term)
+            if idf is None or term not in self.postings:
+                continue
+            for passage_id, tf in self.postings[term]:
+                norm = K1 * (1 - B + B * self.lengths[passage_id] / avg_length)
+                scores[passage_id] += idf * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, top_k: int = 3):
+        """Return the top_k (passage_id, score) pairs, best first"""
+        scores = self.scores(query)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+class PassageIndexBuilder:
+    """Builds a PassageIndex from text that arrives in pieces, e.g. page by page.
+
+    Passages are indexed as soon as all their words have arrived, so the
+    work overlaps with extraction. finish() gives the same index as
+    PassageIndex(full_text).
+    """
+
+    def __init__(self, passage_words=PASSAGE_WORDS, stride=PASSAGE_STRIDE):
+        self.passage_words = passage_words
+        self.stride = stride
+        self._pieces = []
+        self._length = 0
+        # (start, end, terms) of the words not yet behind every future window;
+        # a window's terms are its words' terms, as \w+ never crosses whitespace
+        self._words = []
+        self._word_base = 0  # number of words dropped from the front of _words
+        self._tail = ""  # a word touching the end of the text so far may continue
+        self._next_first = 0
+        self._done = False
+        self._index = PassageIndex.from_parts("", [], [], {})
+
+    def add(self, piece: str):
+        self._pieces.append(piece)
+        tail_start = self._length - len(self._tail)
+        chunk = self._tail + piece
+        self._length += len(piece)
+        matches = list(re.finditer(r"\S+", chunk))
+        self._tail = ""
+        if matches and tail_start + matches[-1].end() == self._length:
+            self._tail = matches.pop().group()
+        self._add_words(tail_start, matches)
+        self._index_passages(final=False)
+
+    def _add_words(self, offset, matches):
+        self._words.extend((offset + m.start(), offset + m.end(), tokenize(m.group())) for m in matches)
+
+    def _index_passages(self, final):
+        index = self._index
+        while not self._done:
+            n_words = self._word_base + len(self._words)
+            first = self._next_first
+            # Until the text is complete, a window is only indexed once more
+            # words follow it, since the window reaching the end is the last
+            if not final and first + self.passage_words >= n_words:
+                break
+            window = self._words[first - self._word_base:first + self.passage_words - self._word_base]
+            if not window:
+                self._done = True
+                break
+            terms = Counter(term for _, _, word_terms in window for term in word_terms)
+            for term, tf in terms.items():
+                index.postings[term].append((len(index.spans), tf))
+            index.spans.append((window[0][0], window[-1][1]))
+            index.lengths.append(sum(terms.values()))
+            self._next_first = first + self.stride
+            self._done = first + self.passage_words >= n_words
+        # Words before the next window are never read again
+        drop = self._next_first - self._word_base
+        if drop > 0:
+            del self._words[:drop]
+            self._word_base += drop
+
+    def finish(self) -> PassageIndex:
+        if self._tail:
+            self._add_words(self._length - len(self._tail), [re.match(r"\S+", self._tail)])
+            self._tail = ""
+        self._index_passages(final=True)
+        self._index.text = "".join(self._pieces)
+        self._index._compute_statistics()
+        return self._index
+
+
+@st.cache_resource(max_entries=16)
+def _load_passage_index(doc_hash: str, _text: str, _built: PassageIndex = None) -> PassageIndex:
+    return _built if _built is not None else PassageIndex(_text)
+
+
+def get_passage_index(text: str, built: PassageIndex = None) -> PassageIndex:
+    """Build (once per document content) and return the passage index.
+
+    An index already built for this text, e.g. by a PassageIndexBuilder
+    during extraction, is stored instead of building a new one.
+    """
+    return _load_passage_index(content_hash(text), text, built)
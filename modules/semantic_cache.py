@@ -0,0 +1,118 @@
+"""Per-document cache of answers keyed by question meaning, not wording.
+
+Questions are embedded with the sentence encoder and looked up with
+random-hyperplane LSH: each of several tables hashes an embedding to a bit
+code by the signs of its projections, and only entries in the same or a
+one-bit-different bucket of any table are compared exactly. Small caches
+are scanned in full.
+"""
+import os
+import threading
+
+import numpy as np
+
+from modules.cache import LRUCache, content_hash
+from modules.model_registry import get_model
+
+# Minimum cosine similarity for a cached answer to be reused
+SIMILARITY_THRESHOLD = float(os.getenv("SMART_ASSISTANT_SEMANTIC_THRESHOLD", "0.85"))
+MAX_QUESTIONS = 512   # per document
+MAX_DOCUMENTS = 32
+LSH_TABLES = 6
+LSH_BITS = 10
+# Below this many entries a full scan is as fast as hashing
+BRUTE_FORCE_SIZE = 64
+
+
+class SemanticCache:
+    """Cached answers of one document, looked up by question embedding"""
+
+    def __init__(self, dimension, threshold=SIMILARITY_THRESHOLD, max_questions=MAX_QUESTIONS, seed=0):
+        self.threshold = threshold
+        self.max_questions = max_questions
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((LSH_TABLES * LSH_BITS, dimension)).astype(np.float32)
+        self.entries = {}   # id -> (embedding, answer), in insertion order
+        self.buckets = {}   # (table, code) -> [id]
+        self.codes = {}     # id -> [code per table]
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _codes(self, embedding) -> list:
+        bits = ((self.planes @ embedding) > 0).reshape(LSH_TABLES, LSH_BITS)
+        return [int(code) for code in bits @ (1 << np.arange(LSH_BITS))]
+
+    def _candidates(self, codes):
+        if len(self.entries) <= BRUTE_FORCE_SIZE:
+            return list(self.entries)
+        # Multi-probe: the exact bucket plus every bucket one bit away, in each table
+        ids = set()
+        for table, code in enumerate(codes):
+            ids.update(self.buckets.get((table, code), ()))
+            for bit in range(LSH_BITS):
+                ids.update(self.buckets.get((table, code ^ (1 << bit)), ()))
+        return list(ids)
+
+    def lookup(self, embedding):
+        """Best cached (similarity, answer) at or above the threshold, else None"""
+        with self._lock:
+            ids = self._candidates(self._codes(embedding))
+            if not ids:
+                return None
+            matrix = np.stack([self.entries[i][0] for i in ids])
+            similarities = matrix @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return float(similarities[best]), self.entries[ids[best]][1]
+
+    def add(self, embedding, answer):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            codes = self._codes(embedding)
+            self.entries[entry_id] = (embedding, answer)
+            self.codes[entry_id] = codes
+            for table, code in enumerate(codes):
+                self.buckets.setdefault((table, code), []).append(entry_id)
+            while len(self.entries) > self.max_questions:
+                oldest = next(iter(self.entries))
+                del self.entries[oldest]
+                for table, code in enumerate(self.codes.pop(oldest)):
+                    self.buckets[(table, code)].remove(oldest)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+_caches = LRUCache(MAX_DOCUMENTS)
+_caches_lock = threading.Lock()
+
+
+def get_semantic_cache(namespace: str, doc_hash: str, dimension: int) -> SemanticCache:
+    key = f"{namespace}:{doc_hash}"
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = SemanticCache(dimension)
+            _caches.set(key, cache)
+        return cache
+
+
+def cached_answer(namespace: str, question: str, context: str, answer_fn) -> dict:
+    """Answer from a similar earlier question on this document, or call answer_fn and remember it"""
+    if not question.strip():
+        return answer_fn()
+    encoder = get_model("encoder")
+    embedding = np.asarray(encoder.encode(question, convert_to_numpy=True, normalize_embeddings=True), dtype=np.float32)
+    cache = get_semantic_cache(namespace, content_hash(context), embedding.shape[0])
+
+    hit = cache.lookup(embedding)
+    if hit is not None:
+        similarity, answer = hit
+        return dict(answer, cached_similarity=similarity)
+
+    result = answer_fn()
+    if not result["answer"].startswith("❌"):
+        cache.add(embedding, result)
+    return result
@@ -0,0 +1,55 @@
+import numpy as np
+import streamlit as st
+from nltk.tokenize import PunktTokenizer
+
+from modules.cache import content_hash
+
+
+class SentenceIndex:
+    """Sorted sentence boundaries of one document for O(log n) span lookups"""
+
+    def __init__(self, text: str, offsets: np.ndarray):
+        self.text = text
+        # (n, 2) array of [start, end) character offsets, sorted by start
+        self.offsets = offsets
+
+    @classmethod
+    def from_text(cls, text: str) -> "SentenceIndex":
+        spans = list(PunktTokenizer().span_tokenize(text))
+        offsets = np.array(spans, dtype=np.int64).reshape(-1, 2)
+        return cls(text, offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def sentence(self, i: int) -> str:
+        start, end = self.offsets[i]
+        return self.text[start:end]
+
+    def sentences(self):
+        return [self.text[start:end] for start, end in self.offsets]
+
+    def sentence_at(self, offset: int) -> int:
+        """Index of the sentence containing (or closest before) a character offset"""
+        i = int(np.searchsorted(self.offsets[:, 0], offset, side="right")) - 1
+        return max(i, 0)
+
+    def sentences_for_span(self, start: int, end: int) -> range:
+        """Indexes of the sentences overlapping the [start, end) span"""
+        if not len(self):
+            return range(0)
+        return range(self.sentence_at(start), self.sentence_at(max(end - 1, start)) + 1)
+
+    def span_text(self, start: int, end: int) -> str:
+        """Text of the sentence(s) containing a span, e.g. a QA answer"""
+        return " ".join(self.sentence(i) for i in self.sentences_for_span(start, end))
+
+
+@st.cache_resource(max_entries=16)
+def _load_sentence_index(doc_hash: str, _text: str) -> SentenceIndex:
+    return SentenceIndex.from_text(_text)
+
+
+def get_sentence_index(text: str) -> SentenceIndex:
+    """Build (once per document content) and return the sentence index"""
+    return _load_sentence_index(content_hash(text), text)
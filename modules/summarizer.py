@@ -1,10 +1,118 @@
-from transformers import pipeline
+from nltk.tokenize import PunktTokenizer
 
-# Load summarization model once (memoized for performance)
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+from modules.cache import DiskCache, content_hash
+from modules.metrics import traced
+from modules.model_registry import MODEL_IDS, get_model
 
-def summarize_text(text: str, max_tokens=150) -> str:
-    # Limit input length for summarization models
-    text = text[:2000]
-    result = summarizer(text, max_length=max_tokens, min_length=50, do_sample=False)
-    return result[0]["summary_text"]
+# BART accepts 1024 positions; keep headroom for special tokens
+CHUNK_TOKENS = 900
+BATCH_SIZE = 4
+# Length bounds for the per-chunk (map) summaries
+CHUNK_SUMMARY_MAX = 120
+CHUNK_SUMMARY_MIN = 30
+
+# Finished summaries shared by every session and process
+summary_cache = DiskCache("summaries", max_bytes=64 * 1024 * 1024)
+
+
+def _summary_key(text, max_tokens, min_length):
+    return f"{content_hash(text)}:{MODEL_IDS['summarizer']}:{max_tokens}:{min_length}"
+
+
+def cached_summary(text: str, max_tokens=150, min_length=50):
+    """Return a previously generated summary for this document and settings, or None"""
+    return summary_cache.get(_summary_key(text.strip(), max_tokens, min_length))
+
+
+def _count_tokens(text: str) -> int:
+    return len(get_model("summarizer").tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def _chunk_spans(text: str, chunk_tokens: int = CHUNK_TOKENS):
+    """Group sentences into [start, end) spans of at most chunk_tokens tokens.
+
+    Only offsets are kept, so the chunk texts are sliced from the document one
+    batch at a time instead of being held in memory all at once.
+    """
+    spans = []
+    chunk_start, chunk_end, chunk_len = None, None, 0
+    for start, end in PunktTokenizer().span_tokenize(text):
+        n_tokens = _count_tokens(text[start:end])
+        if chunk_start is not None and chunk_len + n_tokens > chunk_tokens:
+            spans.append((chunk_start, chunk_end))
+            chunk_start, chunk_len = None, 0
+        if n_tokens > chunk_tokens:
+            # A single oversized "sentence" (tables, missing punctuation) is
+            # split on a character budget that roughly matches the token budget
+            step = max(1, (end - start) * chunk_tokens // n_tokens)
+            for piece_start in range(start, end, step):
+                spans.append((piece_start, min(piece_start + step, end)))
+            continue
+        if chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+        chunk_len += n_tokens
+    if chunk_start is not None:
+        spans.append((chunk_start, chunk_end))
+    return spans
+
+
+def _summarize_batch(texts, max_length, min_length):
+    results = get_model("summarizer")(
+        texts,
+        max_length=max_length,
+        min_length=min_length,
+        do_sample=False,
+        truncation=True,
+        batch_size=BATCH_SIZE,
+    )
+    return [r["summary_text"] for r in results]
+
+
+@traced("summarize_text")
+def summarize_text(text: str, max_tokens=150, min_length=50, progress_callback=None) -> str:
+    """Summarize a document of any length with a map-reduce over token-bounded chunks.
+
+    progress_callback, if given, is called as progress_callback(done, total)
+    after every batch of chunks. Finished summaries are cached on disk by
+    document hash, model and length settings.
+    """
+    text = text.strip()
+    if not text:
+        return ""
+
+    key = _summary_key(text, max_tokens, min_length)
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = _map_reduce_summary(text, max_tokens, min_length, progress_callback)
+        summary_cache.set(key, summary)
+    return summary
+
+
+def _map_reduce_summary(text, max_tokens, min_length, progress_callback):
+    spans = _chunk_spans(text)
+    if len(spans) <= 1:
+        summary = _summarize_batch([text], max_tokens, min_length)[0]
+        if progress_callback:
+            progress_callback(1, 1)
+        return summary
+
+    # Map: summarize chunks a batch at a time
+    partials = []
+    for i in range(0, len(spans), BATCH_SIZE):
+        batch = [text[start:end] for start, end in spans[i:i + BATCH_SIZE]]
+        partials.extend(_summarize_batch(batch, CHUNK_SUMMARY_MAX, CHUNK_SUMMARY_MIN))
+        if progress_callback:
+            progress_callback(min(i + BATCH_SIZE, len(spans)), len(spans))
+
+    # Reduce: the partial summaries are re-summarized until they fit one window
+    combined = " ".join(partials)
+    while _count_tokens(combined) > CHUNK_TOKENS:
+        spans = _chunk_spans(combined)
+        partials = []
+        for i in range(0, len(spans), BATCH_SIZE):
+            batch = [combined[start:end] for start, end in spans[i:i + BATCH_SIZE]]
+            partials.extend(_summarize_batch(batch, CHUNK_SUMMARY_MAX, CHUNK_SUMMARY_MIN))
+        combined = " ".join(partials)
+
+    return _summarize_batch([combined], max_tokens, min_length)[0]